@@ -0,0 +1,147 @@
+# checkpoint.py
+import json
+import os
+import time
+from collections import deque
+
+
+class SearchCheckpoint:
+    """
+    Durable crawl progress, one entry per search term.
+
+    For every term it keeps the term index, the number of result pages already
+    extracted (the page cursor), how many items they produced and whether the
+    term is finished. The file is rewritten after every page through a
+    temporary file + fsync + os.replace, so a crash never leaves it half written.
+    """
+
+    def __init__(self, path, search_terms, terms=None):
+        self.path = path
+        self.search_terms = list(search_terms)
+        self.terms = terms or {}
+        for index, term in enumerate(self.search_terms):
+            self.terms.setdefault(term, {'index': index, 'page': 0, 'items': 0, 'done': False})
+            self.terms[term]['index'] = index
+
+    @classmethod
+    def load(cls, path, search_terms):
+        """Loads the previous checkpoint for these terms (terms it doesn't know start from scratch)."""
+        terms = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                terms = json.load(f).get('terms', {})
+        return cls(path, search_terms, terms)
+
+    def state(self, term):
+        return self.terms[term]
+
+    def done_terms(self):
+        return {term for term in self.search_terms if self.terms[term]['done']}
+
+    def record_page(self, term, page_number, items):
+        state = self.terms[term]
+        state['page'] = max(state['page'], page_number)
+        state['items'] += items
+        state['updated_at'] = time.time()
+        self.save()
+
+    def mark_done(self, term, reason='finished'):
+        state = self.terms[term]
+        state['done'] = True
+        state['done_reason'] = reason
+        state['updated_at'] = time.time()
+        self.save()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'search_terms': self.search_terms, 'terms': self.terms, 'saved_at': time.time()}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class PendingPages:
+    """
+    Holds checkpoint updates back until the items behind them are stored.
+
+    A page is only recorded in the SearchCheckpoint once every item it
+    yielded has been stored or dropped, and a term's pages (and its "done"
+    mark) are recorded in order. If an item of a term fails to store, the
+    term stops advancing, so a resumed crawl redoes it from the last page
+    that fully reached storage instead of skipping items that never did.
+    """
+
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.queues = {}  # term -> deque of pages waiting for their items, oldest first
+        self.items = {}  # id(item) -> (item, term, entry) for items not resolved yet
+        self.failed = set()
+        self.last_pages = {}
+        self.on_done = None  # called with the term once its done mark is in the checkpoint
+
+    def last_page(self, term):
+        """Last page extracted in this run, stored or not (where a re-queued term picks up)."""
+        return max(self.last_pages.get(term, 0), self.checkpoint.state(term)['page'])
+
+    def add_page(self, term, page_number, items):
+        """Call before the items are yielded: storage may confirm them right away."""
+        self.last_pages[term] = max(self.last_pages.get(term, 0), page_number)
+        entry = {'page': page_number, 'items': len(items), 'waiting': set(), 'done': None}
+        for item in items:
+            entry['waiting'].add(id(item))
+            self.items[id(item)] = (item, term, entry)
+        self._add(term, entry)
+
+    def add_done(self, term, reason='finished'):
+        self._add(term, {'page': None, 'items': 0, 'waiting': set(), 'done': reason})
+
+    def resolve(self, item, stored=True):
+        """Marks an item as stored (or deliberately dropped), or as lost when stored is False."""
+        tracked = self.items.pop(id(item), None)
+        if tracked is None:
+            return
+        _, term, entry = tracked
+        entry['waiting'].discard(id(item))
+        if not stored:
+            self.failed.add(term)
+            self.queues.pop(term, None)
+        self._advance(term)
+
+    # Signal handlers (connected by the spider)
+
+    def items_stored(self, items):
+        for item in items:
+            self.resolve(item)
+
+    def items_store_failed(self, items):
+        for item in items:
+            self.resolve(item, stored=False)
+
+    def item_scraped(self, item):
+        self.resolve(item)
+
+    def item_dropped(self, item):
+        self.resolve(item)
+
+    def item_error(self, item):
+        self.resolve(item, stored=False)
+
+    def _add(self, term, entry):
+        if term in self.failed:
+            return
+        self.queues.setdefault(term, deque()).append(entry)
+        self._advance(term)
+
+    def _advance(self, term):
+        queue = self.queues.get(term)
+        while queue and not queue[0]['waiting']:
+            entry = queue.popleft()
+            if entry['done']:
+                self.checkpoint.mark_done(term, entry['done'])
+                if self.on_done is not None:
+                    self.on_done(term)
+            else:
+                self.checkpoint.record_page(term, entry['page'], entry['items'])
+        if not queue:
+            self.queues.pop(term, None)
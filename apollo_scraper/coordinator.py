@@ -0,0 +1,256 @@
+# coordinator.py
+"""
+Runs one crawl as several worker processes sharing a local work queue.
+
+The search terms go into a SQLite queue (<run-dir>/queue.db) and N
+`scrapy crawl` workers are started, each with its own reactor and browser.
+Workers claim terms one at a time until the queue is empty, so a slow term
+never holds up a whole shard. They share the dedup index (DEDUP_SHARED) and
+the SQLite storage file. Each worker dumps its stats when it closes, and
+the coordinator merges them into <run-dir>/stats.json.
+
+Usage (from the project root, next to settings.py; the coordinator sets
+SCRAPY_SETTINGS_MODULE=settings unless it is already set, and the workers
+inherit it):
+    python -m apollo_scraper.coordinator --workers 4
+    python -m apollo_scraper.coordinator --workers 2 --search-terms "CTO,VP Sales" -a extraction_mode=payload
+    python -m apollo_scraper.coordinator --run-dir runs/nightly --resume
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.project import get_project_settings
+
+from apollo_scraper.dedup import DedupIndex
+from apollo_scraper.session import SessionStateCache
+from apollo_scraper.workqueue import TermQueue
+
+logger = logging.getLogger(__name__)
+
+# How per-worker stats combine; everything else numeric is summed
+# (merged latency percentiles are the slowest worker's, not recomputed over all samples)
+MAX_STATS_SUFFIXES = ('_max', '_max_mb', '/p50_ms', '/p99_ms', '_pct', '_open')
+MAX_STATS = {'elapsed_time_seconds', 'finish_time', 'memory_budget_mb', 'memory_rss_mb',
+             'memory_browser_rss_mb', 'memory_total_rss_mb'}
+MIN_STATS = {'start_time', 'time_to_first_item_seconds'}
+
+
+class WorkerStatsExport:
+    """Writes the crawler stats to WORKER_STATS_PATH as JSON when the spider closes."""
+
+    def __init__(self, stats, path):
+        self.stats = stats
+        self.path = path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get('WORKER_STATS_PATH')
+        if not path:
+            raise NotConfigured
+        ext = cls(crawler.stats, path)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_closed(self, spider, reason):
+        stats = dict(self.stats.get_stats(), finish_reason=reason)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=1, sort_keys=True, default=str)
+
+
+def merge_stats(worker_stats):
+    """Merges {worker: stats} into one dict: counters add up, gauges and peaks take the max."""
+    merged = {}
+    for stats in worker_stats.values():
+        for name, value in stats.items():
+            if name not in merged:
+                merged[name] = value
+            elif name in MIN_STATS:
+                merged[name] = min(merged[name], value)
+            elif name in MAX_STATS or name.endswith(MAX_STATS_SUFFIXES):
+                merged[name] = max(merged[name], value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[name] += value
+    merged['finish_reason'] = {worker: stats.get('finish_reason') for worker, stats in worker_stats.items()}
+    merged['workers'] = len(worker_stats)
+    return merged
+
+
+class Coordinator:
+    """Starts the workers, restarts crashed ones while terms are left and merges their stats."""
+
+    def __init__(self, spider_name, search_terms, workers, run_dir, spider_args=(), settings_args=(),
+                 login_timeout=300, max_restarts=1):
+        self.spider_name = spider_name
+        self.search_terms = search_terms
+        self.workers = max(1, workers)
+        self.run_dir = run_dir
+        self.spider_args = list(spider_args)
+        self.settings_args = list(settings_args)
+        self.login_timeout = login_timeout
+        self.max_restarts = max_restarts
+        self.queue = None
+        self.dedup_index = None
+        self.processes = {}
+        self.started = 0
+        self.started_at = None
+
+    def run(self, settings, spidercls):
+        self.started_at = time.time()
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.queue = TermQueue(os.path.join(self.run_dir, 'queue.db'))
+        self.queue.populate(self.search_terms)
+        # Claims left over from an interrupted run go back to the queue
+        released = self.queue.release()
+        counts = self.queue.counts()
+        logger.info(f"Queue: {counts['pending']} pending, {counts['done']} done, {counts['failed']} failed"
+                    f"{f', {released} released from an earlier run' if released else ''}.")
+
+        if settings.getbool('DEDUP_ENABLED', True):
+            # Only used to clear the claims of workers that died before storing their items
+            self.dedup_index = DedupIndex(settings.get('DEDUP_INDEX_PATH', 'apollo_dedup.db'), shared=True)
+            self.dedup_index.open()
+            purged = self.dedup_index.purge_claims()
+            if purged:
+                logger.info(f"Dedup index: {purged} unstored claims from an earlier run cleared.")
+
+        base_port = settings.getint('METRICS_PROMETHEUS_PORT', 0)
+        session_cache = SessionStateCache.from_settings(spidercls.login_state_file, settings)
+        first = self.launch(base_port)
+        if self.workers > 1 and not session_cache.check()[0]:
+            # Let the first worker log in and store the session, so the others reuse it instead of racing it
+            self.wait_for_session(session_cache, first)
+        for _ in range(self.workers - 1):
+            self.launch(base_port)
+
+        restarts = 0
+        while self.processes:
+            time.sleep(1)
+            for worker, process in list(self.processes.items()):
+                if process.poll() is None:
+                    continue
+                del self.processes[worker]
+                released = self.queue.release(worker)
+                if self.dedup_index is not None:
+                    self.dedup_index.purge_claims(worker)
+                level = logging.INFO if process.returncode == 0 else logging.WARNING
+                logger.log(level, f"Worker {worker} exited with code {process.returncode}"
+                                  f"{f', {released} unfinished terms back in the queue' if released else ''}.")
+            pending = self.queue.counts()['pending']
+            if pending and len(self.processes) < min(self.workers, pending) and restarts < self.max_restarts * self.workers:
+                restarts += 1
+                self.launch(base_port)
+
+        counts = self.queue.counts()
+        merged = merge_stats(self.load_worker_stats())
+        merged['queue_terms_done'] = counts['done']
+        merged['queue_terms_pending'] = counts['pending'] + counts['claimed']
+        merged['queue_terms_failed'] = counts['failed']
+        with open(os.path.join(self.run_dir, 'stats.json'), 'w', encoding='utf-8') as f:
+            json.dump(merged, f, indent=1, sort_keys=True, default=str)
+        self.queue.close()
+        if self.dedup_index is not None:
+            self.dedup_index.close()
+        return merged
+
+    def launch(self, base_port=0):
+        worker = f"w{self.started}"
+        self.started += 1
+        command = [
+            sys.executable, '-m', 'scrapy', 'crawl', self.spider_name,
+            '-a', f"work_queue={os.path.join(self.run_dir, 'queue.db')}",
+            '-a', f"worker_id={worker}",
+            '-a', f"search_terms={','.join(self.search_terms)}",
+            '-s', 'DEDUP_SHARED=True',
+            # People stored by any worker of this run don't count as seen in earlier runs (-a incremental=1)
+            '-s', f"DEDUP_RUN_STARTED_AT={self.started_at}",
+            '-s', f"WORKER_STATS_PATH={os.path.join(self.run_dir, f'stats-{worker}.json')}",
+            '-s', f"APOLLO_CHECKPOINT_PATH={os.path.join(self.run_dir, f'checkpoint-{worker}.json')}",
+            '-s', f"METRICS_JSONL_PATH={os.path.join(self.run_dir, f'metrics-{worker}.jsonl')}",
+            '-s', f"LOG_FILE={os.path.join(self.run_dir, f'{worker}.log')}",
+        ]
+        if base_port:
+            command += ['-s', f"METRICS_PROMETHEUS_PORT={base_port + self.started}"]
+        for arg in self.spider_args:
+            command += ['-a', arg]
+        for arg in self.settings_args:
+            command += ['-s', arg]
+        logger.info(f"Starting worker {worker}")
+        self.processes[worker] = subprocess.Popen(command)
+        return worker
+
+    def wait_for_session(self, session_cache, worker):
+        deadline = time.monotonic() + self.login_timeout
+        while time.monotonic() < deadline:
+            if session_cache.check()[0] or self.processes[worker].poll() is not None:
+                return
+            time.sleep(1)
+        logger.warning(f"No stored session after {self.login_timeout}s, starting the other workers anyway.")
+
+    def load_worker_stats(self):
+        worker_stats = {}
+        for name in sorted(os.listdir(self.run_dir)):
+            if name.startswith('stats-') and name.endswith('.json'):
+                with open(os.path.join(self.run_dir, name), encoding='utf-8') as f:
+                    worker_stats[name[len('stats-'):-len('.json')]] = json.load(f)
+        return worker_stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a crawl as several worker processes sharing a term queue.")
+    parser.add_argument('--spider', default='apollo', help="Spider to run in every worker")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes to start")
+    parser.add_argument('--search-terms', default=None,
+                        help="Comma-separated terms (default: the spider's search_terms)")
+    parser.add_argument('--run-dir', default=None,
+                        help="Directory for the queue, worker logs and stats (default: runs/<spider>-<time>)")
+    parser.add_argument('--resume', action='store_true', help="Keep the --run-dir queue and only run unfinished terms")
+    parser.add_argument('--login-timeout', type=float, default=300,
+                        help="Seconds to wait for the first worker's login before starting the others")
+    parser.add_argument('--max-restarts', type=int, default=1,
+                        help="Replacement workers per worker slot while terms are left after a crash")
+    parser.add_argument('-a', dest='spider_args', action='append', default=[], metavar='NAME=VALUE',
+                        help="Spider argument passed to every worker (repeatable)")
+    parser.add_argument('-s', '--set', dest='settings_args', action='append', default=[], metavar='NAME=VALUE',
+                        help="Scrapy setting passed to every worker (repeatable)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [coordinator] %(levelname)s: %(message)s")
+    # There is no scrapy.cfg to find the settings by; the workers inherit this through the environment
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'settings')
+    settings = get_project_settings()
+    # The coordinator reads some of them too (dedup index, metrics port), so apply them here as well
+    settings.setdict(dict(arg.split('=', 1) for arg in args.settings_args), priority='cmdline')
+    spidercls = SpiderLoader.from_settings(settings).load(args.spider)
+    if args.search_terms:
+        search_terms = [term.strip() for term in args.search_terms.split(',') if term.strip()]
+    else:
+        search_terms = list(spidercls.search_terms)
+
+    run_dir = args.run_dir or os.path.join('runs', f"{args.spider}-{time.strftime('%Y%m%dT%H%M%S')}")
+    if os.path.exists(os.path.join(run_dir, 'queue.db')) and not args.resume:
+        sys.exit(f"{run_dir} already has a queue. Pass --resume to continue it or pick another --run-dir.")
+
+    coordinator = Coordinator(args.spider, search_terms, args.workers, run_dir, args.spider_args,
+                              args.settings_args, args.login_timeout, args.max_restarts)
+    merged = coordinator.run(settings, spidercls)
+    print(json.dumps({name: merged.get(name) for name in (
+        'workers', 'queue_terms_done', 'queue_terms_pending', 'queue_terms_failed', 'item_scraped_count',
+        'dedup_dropped_items', 'sqlite_items_written', 'elapsed_time_seconds', 'finish_reason',
+    )}, indent=1, default=str))
+    print(f"Merged stats: {os.path.join(run_dir, 'stats.json')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+# dedup.py
+import hashlib
+import math
+import os
+import sqlite3
+import time
+from urllib.parse import urlsplit
+from urllib.request import pathname2url
+
+
+def normalize_email(email):
+    """Lowercases and strips an email address. Returns None for empty values."""
+    if not email:
+        return None
+    email = email.strip().lower()
+    if email.startswith('mailto:'):
+        email = email[len('mailto:'):]
+    return email or None
+
+
+def normalize_linkedin_url(url):
+    """
+    Reduces a LinkedIn profile URL to 'linkedin.com/in/<slug>' so that
+    http/https, www./country subdomains, query strings and trailing slashes
+    all map to the same key.
+    """
+    if not url:
+        return None
+    url = url.strip().lower()
+    if '://' not in url:
+        url = 'https://' + url
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+    if host != 'linkedin.com' and host.endswith('.linkedin.com'):
+        host = 'linkedin.com'
+    path = parts.path.rstrip('/')
+    if not path:
+        return None
+    return host + path
+
+
+def dedup_keys(item):
+    """Returns the normalized identity keys of a person item (may be empty)."""
+    keys = []
+    email = normalize_email(item.get('email'))
+    if email:
+        keys.append('email:' + email)
+    linkedin = normalize_linkedin_url(item.get('linkedin_url'))
+    if linkedin:
+        keys.append('linkedin:' + linkedin)
+    return keys
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over a bytearray.
+
+    Sized for `capacity` entries at `error_rate` false positives. Uses one
+    blake2b digest per key and double hashing to derive the bit positions.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.capacity = capacity
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupIndex:
+    """
+    Persistent set of seen identity keys.
+
+    A Bloom filter answers "never seen" in memory without touching disk; only
+    Bloom hits are confirmed against the exact set in SQLite (a WITHOUT ROWID
+    primary-key table, read through mmap). Keys are recorded in two steps:
+    claim() reserves them while their item is on its way to storage, commit()
+    persists them (in batches) once the item is stored, and release() gives a
+    claim up when the item is dropped or its write fails. Only stored people
+    count as seen in later runs.
+
+    With shared=True several processes use the same file. There is no Bloom
+    filter, because it would miss the other processes' keys, and claims are
+    rows with stored = 0 inserted with INSERT OR IGNORE, so when two processes
+    claim the same person at once only one of them gets it. Claims left behind
+    by a crashed process are removed with purge_claims().
+
+    open_read_only() opens an existing index for seen() alone (as -a
+    incremental=1 does next to DedupPipeline's own index): no migrations, no
+    cleanup and no Bloom filter, just a second reader on the file.
+    """
+
+    def __init__(self, path, capacity=1000000, error_rate=0.001, batch_size=1000, mmap_size=256 * 1024 * 1024,
+                 shared=False):
+        self.path = path
+        self.shared = shared
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.batch_size = batch_size
+        self.mmap_size = mmap_size
+        self.bloom = None
+        self.connection = None
+        self.claims = {}  # key -> owner, claims of items not stored yet (not shared)
+        self.pending = set()  # committed keys waiting for the next batch insert
+        self.bloom_false_positives = 0
+        self.opened_at = None
+        # Conditions on the stored / first_seen columns; an unmigrated index opened read-only has neither
+        self.stored_clause = "stored = 1"
+        self.first_seen_clause = "(first_seen IS NULL OR first_seen < ?)"
+
+    def open(self):
+        self.opened_at = time.time()
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS seen_keys ("
+                                "key TEXT PRIMARY KEY, stored INTEGER NOT NULL DEFAULT 1, owner TEXT, first_seen REAL) WITHOUT ROWID")
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(seen_keys)")}
+        if 'stored' not in columns:
+            # Index written before keys were claimed first: every key in it was stored
+            self.connection.execute("ALTER TABLE seen_keys ADD COLUMN stored INTEGER NOT NULL DEFAULT 1")
+            self.connection.execute("ALTER TABLE seen_keys ADD COLUMN owner TEXT")
+        if 'first_seen' not in columns:
+            # Keys without a time predate every run that asks seen(before=...)
+            self.connection.execute("ALTER TABLE seen_keys ADD COLUMN first_seen REAL")
+        if not self.shared:
+            # Nobody else uses the file, so any claim in it was left by a crash
+            self.connection.execute("DELETE FROM seen_keys WHERE stored = 0")
+        self.connection.commit()
+
+        stored = self.connection.execute("SELECT COUNT(*) FROM seen_keys WHERE stored = 1").fetchone()[0]
+        if self.shared:
+            return stored
+        # Leave room for this run's keys on top of what is already stored
+        self.bloom = BloomFilter(max(self.capacity, stored * 2), self.error_rate)
+        for (key,) in self.connection.execute("SELECT key FROM seen_keys WHERE stored = 1"):
+            self.bloom.add(key)
+        return stored
+
+    def open_read_only(self):
+        """Opens the index for seen() queries only. Returns False if there is no index file yet."""
+        if not os.path.exists(self.path):
+            return False
+        self.opened_at = time.time()
+        self.connection = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro",
+                                          uri=True, timeout=30)
+        self.connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(seen_keys)")}
+        if 'stored' not in columns:  # written before keys were claimed first: all of them were stored
+            self.stored_clause = "1"
+        if 'first_seen' not in columns:  # and all of them predate this run
+            self.first_seen_clause = "? IS NOT NULL"
+        return True
+
+    def __contains__(self, key):
+        """True if the key belongs to a stored person (claims don't count)."""
+        if key in self.pending:
+            return True
+        if self.bloom is not None and key not in self.bloom:
+            return False
+        found = self.connection.execute(f"SELECT 1 FROM seen_keys WHERE key = ? AND {self.stored_clause}",
+                                        (key,)).fetchone() is not None
+        if not found and self.bloom is not None:
+            self.bloom_false_positives += 1
+        return found
+
+    def seen(self, keys, before=None):
+        """
+        True if any of the keys belongs to a stored person. Does not record
+        anything. With before (a time.time() value), only keys first stored
+        earlier count, so people stored by the current run are ignored.
+        """
+        if before is None:
+            return any(key in self for key in keys)
+        for key in keys:
+            if self.bloom is not None and key not in self.bloom:
+                continue
+            if self.connection.execute(
+                    f"SELECT 1 FROM seen_keys WHERE key = ? AND {self.stored_clause} AND {self.first_seen_clause}",
+                    (key, before)).fetchone() is not None:
+                return True
+        return False
+
+    def claim(self, keys, owner):
+        """
+        Reserves the keys for an item on its way to storage. Returns True
+        (and reserves nothing) if any of them is stored or claimed already.
+        """
+        if self.shared:
+            with self.connection:
+                taken = [key for key in keys if self.connection.execute(
+                    "INSERT OR IGNORE INTO seen_keys (key, stored, owner, first_seen) VALUES (?, 0, ?, ?)",
+                    (key, owner, time.time())).rowcount]
+            if len(taken) < len(keys):
+                self.release(taken, owner)
+                return True
+            return False
+        if any(key in self.claims or key in self for key in keys):
+            return True
+        for key in keys:
+            self.claims[key] = owner
+        return False
+
+    def commit(self, keys):
+        """Records the keys of a stored item for this and later runs."""
+        if self.shared:
+            with self.connection:
+                self.connection.executemany("UPDATE seen_keys SET stored = 1, owner = NULL WHERE key = ?",
+                                            ((key,) for key in keys))
+            return
+        for key in keys:
+            self.claims.pop(key, None)
+            self.bloom.add(key)
+            self.pending.add(key)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def release(self, keys, owner):
+        """Gives up the owner's claims on the keys (its item was dropped or not stored)."""
+        if self.shared:
+            with self.connection:
+                self.connection.executemany("DELETE FROM seen_keys WHERE key = ? AND stored = 0 AND owner = ?",
+                                            ((key, owner) for key in keys))
+            return
+        for key in keys:
+            if self.claims.get(key) == owner:
+                del self.claims[key]
+
+    def purge_claims(self, owner_prefix=None):
+        """Removes claims of items that were never stored (only the owner_prefix's, if given). Returns how many."""
+        with self.connection:
+            if owner_prefix is None:
+                return self.connection.execute("DELETE FROM seen_keys WHERE stored = 0").rowcount
+            return self.connection.execute("DELETE FROM seen_keys WHERE stored = 0 AND owner LIKE ?",
+                                           (f"{owner_prefix}:%",)).rowcount
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.connection:
+            now = time.time()
+            self.connection.executemany("INSERT OR IGNORE INTO seen_keys (key, first_seen) VALUES (?, ?)",
+                                        ((key, now) for key in self.pending))
+        self.pending.clear()
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,271 @@
+# exports.py
+import csv
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ('name', 'title', 'company', 'email', 'phone', 'linkedin_url', 'scraped_at')
+
+
+class HashingFile(io.RawIOBase):
+    """Binary output file that feeds every byte written to a sha256, so the digest is ready at close."""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.sha256 = hashlib.sha256()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self.file.write(data)
+
+    def tell(self):
+        return self.file.tell()
+
+    def flush(self):
+        if not self.file.closed:
+            self.file.flush()
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self.file.close()
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+class JsonLinesGzipWriter:
+    def __init__(self, path, fields):
+        self.fields = fields
+        # Hashes the compressed bytes, i.e. the file as it lands on disk
+        self.raw = HashingFile(path)
+        self.file = gzip.GzipFile(fileobj=self.raw, mode='wb')
+
+    def write(self, row):
+        self.file.write(json.dumps(row, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def bytes_written(self):
+        # Compressed bytes on disk, not counting what zlib still holds
+        return self.raw.tell()
+
+    def close(self):
+        self.file.close()
+        self.raw.close()
+
+
+class CsvWriter:
+    def __init__(self, path, fields):
+        self.fields = fields
+        self.raw = HashingFile(path)
+        self.file = io.TextIOWrapper(self.raw, encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=fields)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def bytes_written(self):
+        self.file.flush()
+        return self.raw.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Buffers one row group at a time, so memory stays bounded by row_group_size."""
+
+    def __init__(self, path, fields, row_group_size=10000):
+        self.fields = fields
+        self.row_group_size = row_group_size
+        self.schema = pyarrow.schema([(field, pyarrow.float64() if field == 'scraped_at' else pyarrow.string())
+                                      for field in fields])
+        self.raw = HashingFile(path)
+        self.writer = pyarrow.parquet.ParquetWriter(self.raw, self.schema, compression='zstd')
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if self.rows:
+            self.writer.write_table(pyarrow.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def bytes_written(self):
+        return self.raw.tell()
+
+    def close(self):
+        self._write_row_group()
+        self.writer.close()
+        self.raw.close()
+
+
+WRITERS = {
+    'jsonl.gz': JsonLinesGzipWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RotatingExportPipeline:
+    """
+    Streams items into rotating, compressed export parts.
+
+    Items are written as they arrive (JSONL.gz, CSV or Parquet), so memory
+    use doesn't grow with the run. A part is closed once it holds
+    EXPORT_MAX_ITEMS items or EXPORT_MAX_BYTES bytes. While open it carries
+    an .inprogress suffix. On close it is renamed to its final name and gets
+    a <part>.manifest.json next to it (item count, size, sha256, time range).
+    Downstream jobs can pick up every part that has a manifest while the
+    crawl is still running. A run manifest listing all parts is written
+    when the spider closes.
+    """
+
+    def __init__(self, export_dir, export_format='jsonl.gz', max_items=100000, max_bytes=0,
+                 fields=EXPORT_FIELDS, parquet_row_group_size=10000, stats=None):
+        if export_format not in WRITERS:
+            raise ValueError(f"Unknown EXPORT_FORMAT: {export_format!r} (expected one of {', '.join(WRITERS)})")
+        self.export_dir = export_dir
+        self.export_format = export_format
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.fields = tuple(fields)
+        self.parquet_row_group_size = parquet_row_group_size
+        self.stats = stats
+
+        self.run_id = None
+        self.parts = []
+        self.writer = None
+        self.part = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('EXPORT_ENABLED'):
+            raise NotConfigured
+        export_format = settings.get('EXPORT_FORMAT', 'jsonl.gz')
+        if export_format == 'parquet' and pyarrow is None:
+            raise NotConfigured("EXPORT_FORMAT = 'parquet' needs pyarrow (pip install pyarrow)")
+        pipeline = cls(
+            export_dir=settings.get('EXPORT_DIR', 'exports'),
+            export_format=export_format,
+            max_items=settings.getint('EXPORT_MAX_ITEMS', 100000),
+            max_bytes=settings.getint('EXPORT_MAX_BYTES', 0),
+            parquet_row_group_size=settings.getint('EXPORT_PARQUET_ROW_GROUP_SIZE', 10000),
+            stats=crawler.stats,
+        )
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        os.makedirs(self.export_dir, exist_ok=True)
+        self.run_id = f"{spider.name}-{time.strftime('%Y%m%dT%H%M%S')}"
+        if getattr(spider, 'worker_id', None):
+            # Workers of one coordinated run export side by side
+            self.run_id += f"-{spider.worker_id}"
+        spider.logger.info(f"Exporting items to {self.export_dir} as {self.export_format} parts ({self.run_id}).")
+
+    def process_item(self, item, spider):
+        if self.writer is None:
+            self._open_part()
+        row = {field: item.get(field) for field in self.fields if field != 'scraped_at'}
+        scraped_at = time.time()
+        if 'scraped_at' in self.fields:
+            row['scraped_at'] = scraped_at
+        self.writer.write(row)
+
+        part = self.part
+        part['items'] += 1
+        part['first_item_at'] = part['first_item_at'] or scraped_at
+        part['last_item_at'] = scraped_at
+        if (self.max_items and part['items'] >= self.max_items) or \
+                (self.max_bytes and self.writer.bytes_written() >= self.max_bytes):
+            self._close_part()
+        return item
+
+    def _open_part(self):
+        name = f"{self.run_id}-part-{len(self.parts) + 1:05d}.{self.export_format}"
+        path = os.path.join(self.export_dir, name)
+        in_progress = f"{path}.inprogress"
+        if self.export_format == 'parquet':
+            self.writer = ParquetWriter(in_progress, self.fields, self.parquet_row_group_size)
+        else:
+            self.writer = WRITERS[self.export_format](in_progress, self.fields)
+        self.part = {'file': name, 'path': path, 'items': 0, 'first_item_at': None, 'last_item_at': None,
+                     'opened_at': time.time()}
+
+    def _close_part(self):
+        self.writer.close()
+        # Hashed while the part was written, so closing it doesn't read the file back
+        sha256 = self.writer.raw.hexdigest()
+        part, self.writer, self.part = self.part, None, None
+        path = part.pop('path')
+        os.replace(f"{path}.inprogress", path)
+
+        manifest = {
+            'run_id': self.run_id,
+            'part': len(self.parts) + 1,
+            'file': part['file'],
+            'format': self.export_format,
+            'fields': list(self.fields),
+            'items': part['items'],
+            'bytes': os.path.getsize(path),
+            'sha256': sha256,
+            'first_item_at': part['first_item_at'],
+            'last_item_at': part['last_item_at'],
+            'opened_at': part['opened_at'],
+            'closed_at': time.time(),
+        }
+        # Written after the rename: a manifest means the part is complete
+        write_json_atomic(f"{path}.manifest.json", manifest)
+        self.parts.append(manifest)
+        if self.stats:
+            self.stats.inc_value('export_parts_written')
+            self.stats.inc_value('export_items_written', manifest['items'])
+            self.stats.inc_value('export_bytes_written', manifest['bytes'])
+        logger.info(f"Export part {part['file']} closed ({manifest['items']} items, {manifest['bytes']} bytes).")
+
+    def spider_closed(self, spider, reason):
+        if self.writer is not None:
+            self._close_part()
+        if self.run_id is None:
+            return
+        write_json_atomic(os.path.join(self.export_dir, f"{self.run_id}.manifest.json"), {
+            'run_id': self.run_id,
+            'format': self.export_format,
+            'finish_reason': reason,
+            'complete': True,
+            'items': sum(part['items'] for part in self.parts),
+            'parts': [part['file'] for part in self.parts],
+        })
+        spider.logger.info(f"Export finished: {len(self.parts)} parts in {self.export_dir} ({reason}).")
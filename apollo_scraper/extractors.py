@@ -0,0 +1,81 @@
+# extractors.py
+import codecs
+
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+from apollo_scraper.items import ApolloPerson
+
+
+def _field_cleaners(item_cls, field_name):
+    """
+    Returns the cleaning functions of a field's MapCompose input processor,
+    so the fast path applies exactly what the ItemLoader would.
+    """
+    processor = item_cls.fields[field_name].get('input_processor')
+    return tuple(getattr(processor, 'functions', ()))
+
+
+class PeopleRowExtractor:
+    """
+    Single-pass extractor for people result rows.
+
+    The CSS selectors are translated to XPath and compiled once. Each page is
+    then walked once: every row is located with one compiled query and each
+    field is read from the row with its own compiled query. The output matches
+    ItemLoader(ApolloPerson()) with MapCompose/TakeFirst processors, without
+    building a loader and six Selector lists per row.
+    """
+
+    def __init__(self, row_selector, field_selectors, item_cls=ApolloPerson):
+        translator = HTMLTranslator()
+        self.item_cls = item_cls
+        self._rows_xpath = etree.XPath(translator.css_to_xpath(row_selector))
+        self._fields = [
+            (name, etree.XPath(translator.css_to_xpath(css)), _field_cleaners(item_cls, name))
+            for name, css in field_selectors.items()
+        ]
+
+    def extract_rows(self, root):
+        """Returns one dict of cleaned field values per row found under the lxml root."""
+        rows = []
+        for row in self._rows_xpath(root):
+            fields = {}
+            for name, xpath, cleaners in self._fields:
+                value = self._take_first(xpath(row), cleaners)
+                if value is not None:
+                    fields[name] = value
+            rows.append(fields)
+        return rows
+
+    def extract(self, response):
+        """
+        Same as extract_rows for a Scrapy response. The tree is parsed here
+        instead of through response.selector, which caches a Selector that
+        points back at the response: that cycle would keep the HTML and its
+        lxml tree alive until the next full garbage collection.
+        """
+        if not response.body.strip():
+            return []
+        # libxml2 doesn't know every Python codec name (latin-1, utf-8-sig, ...): anything
+        # other than UTF-8 is decoded by Scrapy and handed over re-encoded as UTF-8
+        body = response.body
+        if codecs.lookup(response.encoding).name != 'utf-8':
+            body = response.text.encode('utf-8')
+        parser = etree.HTMLParser(recover=True, encoding='utf-8')
+        root = etree.fromstring(body, parser=parser, base_url=response.url)
+        return self.extract_rows(root) if root is not None else []
+
+    @staticmethod
+    def _take_first(values, cleaners):
+        # MapCompose drops None results, TakeFirst skips None and '' values
+        for value in values:
+            # str() detaches XPath string results from the tree so it can be freed
+            value = str(value)
+            for clean in cleaners:
+                value = clean(value)
+                if value is None:
+                    break
+            if value is not None and value != '':
+                return value
+        return None
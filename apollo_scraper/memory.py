@@ -0,0 +1,159 @@
+# memory.py
+import logging
+import os
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+try:
+    import psutil
+except ImportError:  # /proc is read directly on Linux when psutil isn't installed
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def _proc_rss(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _proc_descendants(pid):
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, the fields after it don't
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    descendants, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            descendants.append(child)
+            stack.append(child)
+    return descendants
+
+
+def measure_rss(pid=None):
+    """
+    Returns (own_rss, children_rss) in bytes. The children are every process
+    started below this one: the Playwright driver and the browser processes.
+    """
+    pid = pid or os.getpid()
+    if psutil is not None:
+        process = psutil.Process(pid)
+        own = process.memory_info().rss
+        children = 0
+        for child in process.children(recursive=True):
+            try:
+                children += child.memory_info().rss
+            except psutil.Error:  # exited in the meantime
+                pass
+        return own, children
+    children = 0
+    for child in _proc_descendants(pid):
+        try:
+            children += _proc_rss(child)
+        except OSError:
+            pass
+    return _proc_rss(pid), children
+
+
+class MemoryGovernor:
+    """
+    Keeps the crawler and its browsers under MEMORY_BUDGET_MB.
+
+    Every MEMORY_CHECK_INTERVAL seconds it measures the RSS of this process
+    plus the browser processes below it. Above the budget it pauses the
+    engine, so no new requests (and no new pages or contexts) come out of
+    the scheduler. Running search streams go on and close their pages as
+    their terms end. Once usage is back under MEMORY_RESUME_RATIO * budget,
+    the crawl resumes. Current usage against the budget is kept in the
+    memory_* stats.
+    """
+
+    def __init__(self, crawler, budget_mb, resume_ratio=0.85, interval=5.0):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.budget = budget_mb * MB
+        self.resume_at = self.budget * resume_ratio
+        self.interval = interval
+        self.loop = None
+        self.paused_at = None
+        self.spider = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('MEMORY_GOVERNOR_ENABLED') or not settings.getint('MEMORY_BUDGET_MB'):
+            raise NotConfigured
+        if psutil is None and not os.path.isdir('/proc'):
+            raise NotConfigured("MemoryGovernor needs psutil on this platform (pip install psutil)")
+        ext = cls(
+            crawler,
+            budget_mb=settings.getint('MEMORY_BUDGET_MB'),
+            resume_ratio=settings.getfloat('MEMORY_RESUME_RATIO', 0.85),
+            interval=settings.getfloat('MEMORY_CHECK_INTERVAL', 5.0),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        self.spider = spider
+        self.stats.set_value('memory_budget_mb', round(self.budget / MB))
+        self.loop = task.LoopingCall(self.check)
+        self.loop.start(self.interval, now=True)
+
+    def spider_closed(self, spider, reason):
+        if self.loop is not None and self.loop.running:
+            self.loop.stop()
+        if self.paused_at is not None:
+            self._record_paused_time()
+
+    def check(self):
+        own, children = measure_rss()
+        total = own + children
+        self.stats.set_value('memory_rss_mb', round(own / MB, 1))
+        self.stats.set_value('memory_browser_rss_mb', round(children / MB, 1))
+        self.stats.set_value('memory_total_rss_mb', round(total / MB, 1))
+        self.stats.max_value('memory_total_rss_max_mb', round(total / MB, 1))
+        self.stats.set_value('memory_budget_used_pct', round(100 * total / self.budget, 1))
+
+        engine = self.crawler.engine
+        if self.paused_at is None and total > self.budget:
+            logger.warning(f"Memory {total / MB:.0f} MB is over the {self.budget / MB:.0f} MB budget "
+                           f"(browser {children / MB:.0f} MB). Pausing new requests.")
+            self.stats.inc_value('memory_pauses')
+            self.paused_at = time.monotonic()
+            engine.pause()
+        elif self.paused_at is not None:
+            if total <= self.resume_at:
+                logger.info(f"Memory back to {total / MB:.0f} MB. Resuming.")
+                self._resume(engine)
+            elif not self.open_pages():
+                # Nothing left to finish and free memory: waiting longer would stall the crawl
+                logger.warning(f"Memory {total / MB:.0f} MB is still over budget with no pages open. "
+                               "MEMORY_BUDGET_MB is below the idle footprint; resuming anyway.")
+                self._resume(engine)
+
+    def open_pages(self):
+        """Pages the spider still holds open (read from its PageManager, not from a stat that may lag)."""
+        page_manager = getattr(self.spider, 'page_manager', None)
+        return page_manager.open_count if page_manager is not None else 0
+
+    def _resume(self, engine):
+        self._record_paused_time()
+        engine.unpause()
+
+    def _record_paused_time(self):
+        self.stats.inc_value('memory_paused_seconds', round(time.monotonic() - self.paused_at, 3))
+        self.paused_at = None
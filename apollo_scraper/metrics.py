@@ -0,0 +1,248 @@
+# metrics.py
+import functools
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import defer, task
+
+logger = logging.getLogger(__name__)
+
+# Custom signal: sent with stage=<name>, seconds=<duration> for every timed stage
+stage_latency = object()
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float('inf'))
+
+
+def record_stage(crawler, stage, seconds):
+    """Reports one stage duration to the metrics extension (a no-op when it is disabled)."""
+    crawler.signals.send_catch_log(stage_latency, stage=stage, seconds=seconds)
+
+
+@contextmanager
+def timed(crawler, stage):
+    """Times the enclosed block (also around awaits) as one observation of `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(crawler, stage, time.perf_counter() - started)
+
+
+def timed_stage(stage):
+    """
+    Decorator for pipeline process_item methods. If the method returns a
+    Deferred, the observation is taken when it fires rather than on return.
+    """
+    def decorator(process_item):
+        @functools.wraps(process_item)
+        def wrapper(self, item, spider):
+            started = time.perf_counter()
+
+            def done(result):
+                record_stage(spider.crawler, stage, time.perf_counter() - started)
+                return result
+
+            try:
+                result = process_item(self, item, spider)
+            except Exception:
+                done(None)
+                raise
+            if isinstance(result, defer.Deferred):
+                return result.addBoth(done)
+            return done(result)
+        return wrapper
+    return decorator
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus layout)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Estimates a quantile by linear interpolation inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                upper = self.max if bound == float('inf') else min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p90': round(self.quantile(0.9), 6),
+            'p99': round(self.quantile(0.99), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class MetricsExtension:
+    """
+    Per-stage latency histograms, in-flight pages and item throughput.
+
+    Stages report through the stage_latency signal (see timed / timed_stage):
+    login, session_probe, search_submit, results_wait, page_turn, parse_people and one
+    pipeline.<name> stage per item pipeline. Every METRICS_INTERVAL seconds a
+    snapshot is appended to METRICS_JSONL_PATH, and with METRICS_PROMETHEUS_PORT
+    set the same data is served as Prometheus text on /metrics. Nothing
+    outside the process is required.
+    """
+
+    def __init__(self, stats, interval=30.0, jsonl_path=None, prometheus_port=0, prometheus_host='127.0.0.1'):
+        self.stats = stats
+        self.interval = interval
+        self.jsonl_path = jsonl_path
+        self.prometheus_port = prometheus_port
+        self.prometheus_host = prometheus_host
+
+        self.histograms = {}
+        self.items_scraped = 0
+        self.started_at = None
+        self.last_snapshot = (time.monotonic(), 0)
+        self.items_per_second = 0.0
+        self.loop = None
+        self.listening_port = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('METRICS_ENABLED'):
+            raise NotConfigured
+        ext = cls(
+            crawler.stats,
+            interval=settings.getfloat('METRICS_INTERVAL', 30.0),
+            jsonl_path=settings.get('METRICS_JSONL_PATH'),
+            prometheus_port=settings.getint('METRICS_PROMETHEUS_PORT', 0),
+            prometheus_host=settings.get('METRICS_PROMETHEUS_HOST', '127.0.0.1'),
+        )
+        crawler.signals.connect(ext.observe, signal=stage_latency)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def observe(self, stage, seconds):
+        if stage not in self.histograms:
+            self.histograms[stage] = Histogram()
+        self.histograms[stage].observe(seconds)
+
+    def item_scraped(self, item, spider):
+        self.items_scraped += 1
+
+    def spider_opened(self, spider):
+        self.started_at = time.monotonic()
+        self.last_snapshot = (self.started_at, 0)
+        if self.prometheus_port:
+            self._listen()
+        if self.interval > 0 and (self.jsonl_path or self.prometheus_port):
+            self.loop = task.LoopingCall(self.tick)
+            self.loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.loop is not None and self.loop.running:
+            self.loop.stop()
+        self.tick()
+        for stage, histogram in sorted(self.histograms.items()):
+            summary = histogram.summary()
+            self.stats.set_value(f'latency/{stage}/p50_ms', round(summary['p50'] * 1000, 1))
+            self.stats.set_value(f'latency/{stage}/p99_ms', round(summary['p99'] * 1000, 1))
+        if self.listening_port is not None:
+            return self.listening_port.stopListening()
+
+    def tick(self):
+        """Updates throughput and appends a snapshot to the JSONL dump."""
+        now = time.monotonic()
+        last_time, last_items = self.last_snapshot
+        if now > last_time:
+            self.items_per_second = (self.items_scraped - last_items) / (now - last_time)
+        self.last_snapshot = (now, self.items_scraped)
+        if self.jsonl_path:
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+
+    def snapshot(self):
+        return {
+            'time': time.time(),
+            'uptime_seconds': round(time.monotonic() - (self.started_at or time.monotonic()), 3),
+            'pages_open': self.stats.get_value('playwright_pages_open', 0),
+            'items_scraped': self.items_scraped,
+            'items_per_second': round(self.items_per_second, 3),
+            'stages': {stage: h.summary() for stage, h in sorted(self.histograms.items())},
+        }
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP apollo_stage_latency_seconds Time spent per crawl stage.",
+            "# TYPE apollo_stage_latency_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'apollo_stage_latency_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'apollo_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'apollo_stage_latency_seconds_count{{stage="{stage}"}} {histogram.count}')
+        lines += [
+            "# HELP apollo_pages_open Playwright pages currently open.",
+            "# TYPE apollo_pages_open gauge",
+            f"apollo_pages_open {self.stats.get_value('playwright_pages_open', 0)}",
+            "# HELP apollo_items_scraped_total Items that passed all pipelines.",
+            "# TYPE apollo_items_scraped_total counter",
+            f"apollo_items_scraped_total {self.items_scraped}",
+            "# HELP apollo_items_per_second Item throughput over the last interval.",
+            "# TYPE apollo_items_per_second gauge",
+            f"apollo_items_per_second {self.items_per_second}",
+            "# HELP apollo_scrapy_stat Numeric Scrapy stats.",
+            "# TYPE apollo_scrapy_stat gauge",
+        ]
+        for name, value in sorted(self.stats.get_stats().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f'apollo_scrapy_stat{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def _listen(self):
+        from twisted.internet import reactor
+        from twisted.web import resource, server
+
+        ext = self
+
+        class MetricsResource(resource.Resource):
+            isLeaf = True
+
+            def render_GET(self, request):
+                request.setHeader(b'content-type', b'text/plain; version=0.0.4; charset=utf-8')
+                return ext.render_prometheus().encode('utf-8')
+
+        self.listening_port = reactor.listenTCP(self.prometheus_port, server.Site(MetricsResource()),
+                                                interface=self.prometheus_host)
+        logger.info(f"Serving Prometheus metrics on http://{self.prometheus_host}:{self.prometheus_port}/metrics")
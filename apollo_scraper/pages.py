@@ -0,0 +1,55 @@
+# pages.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PageManager:
+    """
+    Owns the Playwright pages the spider keeps open (playwright_include_page).
+
+    Every page handed to a callback or errback is registered under the stream
+    it belongs to (a search term, or "login"), and close() is the single place
+    pages are closed. Open-page counts are kept in the crawler stats so a leak
+    shows up as a growing playwright_pages_open value.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats
+        self.pages = {}
+
+    @property
+    def open_count(self):
+        return len(self.pages)
+
+    def register(self, page, stream):
+        if page is None or page in self.pages:
+            return page
+        self.pages[page] = stream
+        if self.stats:
+            self.stats.inc_value('playwright_pages_opened')
+            self.stats.max_value('playwright_pages_open_max', self.open_count)
+        self._update_open_stat()
+        return page
+
+    async def close(self, page):
+        """Closes a page; safe to call twice or with None."""
+        if page is None:
+            return
+        stream = self.pages.pop(page, None)
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception as e:
+            logger.warning(f"Error closing page for stream {stream!r}: {e}")
+        if self.stats:
+            self.stats.inc_value('playwright_pages_closed')
+        self._update_open_stat()
+
+    async def close_all(self):
+        for page in list(self.pages):
+            await self.close(page)
+
+    def _update_open_stat(self):
+        if self.stats:
+            self.stats.set_value('playwright_pages_open', self.open_count)
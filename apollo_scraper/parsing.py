@@ -0,0 +1,80 @@
+# parsing.py
+import asyncio
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+from apollo_scraper.extractors import PeopleRowExtractor
+
+# Text of the pages Apollo serves instead of results when it blocks us
+BLOCK_MARKERS = ("Access Denied", "Rate Limit Exceeded")
+# One alternation, so a page is scanned once for all markers
+BLOCK_PATTERN = re.compile("|".join(re.escape(marker) for marker in BLOCK_MARKERS))
+BLOCK_PATTERN_BYTES = re.compile("|".join(re.escape(marker) for marker in BLOCK_MARKERS).encode('utf-8'))
+
+# Per worker process: extractors compiled on first use, keyed by their selectors
+_extractors = {}
+
+
+def parse_results_page(body, row_selector, field_selectors):
+    """
+    Worker entry point: returns (rows, blocked) for a UTF-8 encoded results page.
+    rows holds one dict of cleaned fields per person, ready for ApolloPerson(**row).
+    """
+    if BLOCK_PATTERN_BYTES.search(body):
+        return [], True
+    key = (row_selector, tuple(field_selectors.items()))
+    if key not in _extractors:
+        _extractors[key] = PeopleRowExtractor(row_selector, field_selectors)
+    root = etree.fromstring(body, parser=etree.HTMLParser(recover=True, encoding='utf-8')) if body else None
+    if root is None:
+        return [], False
+    return _extractors[key].extract_rows(root), False
+
+
+class ParsePool:
+    """
+    Parses results pages in worker processes instead of on the reactor thread.
+
+    The rendered HTML goes to a process pool (spawned, not forked, since the
+    crawler process runs Playwright and reactor threads). The rows come back
+    as an awaitable. At most max_pending pages are queued or being parsed at
+    a time. Past that, the submitting stream waits, so a burst of large
+    pages can't pile up in memory or crowd out browser I/O.
+    """
+
+    def __init__(self, workers, max_pending=None, stats=None):
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+        self.stats = stats
+        self._executor = None
+        self._semaphore = None
+
+    @classmethod
+    def from_settings(cls, settings, stats=None):
+        workers = settings.getint('APOLLO_PARSE_WORKERS', 0)
+        if workers <= 0:
+            return None
+        return cls(workers, settings.getint('APOLLO_PARSE_MAX_PENDING', 0), stats)
+
+    async def parse(self, body, row_selector, field_selectors):
+        """Returns (rows, blocked) for the page, see parse_results_page."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            # Created lazily so it binds to the reactor's running event loop
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        if self._semaphore.locked() and self.stats:
+            self.stats.inc_value('parse_pool_queue_full_waits')
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, parse_results_page, body, row_selector, field_selectors)
+        if self.stats:
+            self.stats.inc_value('parse_pool_pages_parsed')
+        return result
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,155 @@
+# payloads.py
+import asyncio
+import re
+
+from apollo_scraper.items import ApolloPerson, clean_email_href, clean_text
+from apollo_scraper.ratelimit import parse_retry_after
+
+# XHR endpoints the people search page loads its results from
+SEARCH_PAYLOAD_URL_PATTERN = re.compile(r'/api/v1/(mixed_people|people|contacts)/search')
+
+# Apollo returns placeholders like "email_not_unlocked@domain.com" for locked emails
+LOCKED_EMAIL_MARKER = 'not_unlocked'
+
+
+def _phone_from_record(record):
+    for phone in record.get('phone_numbers') or []:
+        # raw_number is what the results table displays, so both modes agree
+        number = phone.get('raw_number') or phone.get('sanitized_number')
+        if number:
+            return number
+    return record.get('sanitized_phone')
+
+
+def person_from_record(record):
+    """Maps one person/contact record of a search payload to an ApolloPerson."""
+    organization = record.get('organization') or {}
+    name = record.get('name')
+    if not name:
+        name = " ".join(part for part in (record.get('first_name'), record.get('last_name')) if part)
+    email = clean_email_href(record.get('email'))
+    if email and LOCKED_EMAIL_MARKER in email:
+        email = None
+
+    values = {
+        'name': clean_text(name),
+        'title': clean_text(record.get('title')),
+        'company': clean_text(organization.get('name') or record.get('organization_name')),
+        'email': email,
+        'phone': clean_text(_phone_from_record(record)),
+        'linkedin_url': record.get('linkedin_url'),
+    }
+    # Same as TakeFirst: empty values are left out of the item
+    return ApolloPerson({field: value for field, value in values.items() if value})
+
+
+def people_from_payload(payload):
+    """Returns the ApolloPerson items of a search payload ('people' and 'contacts' lists)."""
+    people = []
+    for key in ('contacts', 'people'):
+        for record in payload.get(key) or []:
+            person = person_from_record(record)
+            if person:
+                people.append(person)
+    return people
+
+
+def payload_page(payload):
+    """Results page number a search payload is for, or None if it doesn't say."""
+    return (payload.get('pagination') or {}).get('page')
+
+
+def has_next_page(payload):
+    pagination = payload.get('pagination') or {}
+    page, total_pages = pagination.get('page'), pagination.get('total_pages')
+    if page is None or total_pages is None:
+        return None  # Unknown, let the DOM decide
+    return page < total_pages
+
+
+class PayloadCapture:
+    """
+    Collects search result payloads per Playwright page.
+
+    handle_response is registered as the page's "response" event handler, so it
+    sees the search XHR even if it completes before the callback runs. The
+    callback then awaits collect() for that page to get the decoded JSON.
+    Payloads still queued when the page moves on (call discard() before
+    turning it), or labelled with another results page, are never returned
+    for the next one.
+
+    The search XHRs behind in-page pagination never pass through the
+    downloader, so RateLimitMiddleware can't see them. A rate-limited one
+    (http_codes) is fed to the shared backoff here, Retry-After included,
+    and the page is marked throttled() so the spider re-queues the term.
+    With keep_payloads=False (DOM extraction) only that check is done.
+    """
+
+    def __init__(self, url_pattern=SEARCH_PAYLOAD_URL_PATTERN, backoff=None, http_codes=(429,), keep_payloads=True):
+        self.url_pattern = url_pattern
+        self.backoff = backoff
+        self.http_codes = set(http_codes)
+        self.keep_payloads = keep_payloads
+        self._responses = {}
+        self._arrived = {}
+        self._throttled = set()
+
+    def _event(self, page):
+        if page not in self._arrived:
+            self._arrived[page] = asyncio.Event()
+        return self._arrived[page]
+
+    def handle_response(self, response):
+        if not self.url_pattern.search(response.url):
+            return
+        page = response.frame.page
+        if response.status in self.http_codes:
+            if self.backoff is not None:
+                self.backoff.hit(parse_retry_after(response.headers.get('retry-after')))
+            self._throttled.add(page)
+            # Wakes collect() up: no payload is coming for this page
+            self._event(page).set()
+            return
+        if response.status != 200 or not self.keep_payloads:
+            return
+        self._responses.setdefault(page, []).append(response)
+        self._event(page).set()
+
+    def throttled(self, page):
+        """True if a search XHR of the page was rate limited since the page was last discarded."""
+        return page in self._throttled
+
+    async def collect(self, page, timeout, page_number=None):
+        """
+        Waits up to `timeout` seconds for payloads on the page and returns them decoded.
+        With page_number, payloads for another results page (a late response to the
+        previous one) are dropped and the wait goes on for the right one.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        payloads = []
+        while True:
+            try:
+                await asyncio.wait_for(self._event(page).wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            responses = self._responses.pop(page, [])
+            self._arrived.pop(page, None)
+            stale = 0
+            for response in responses:
+                try:
+                    payload = await response.json()
+                except Exception:
+                    # Body no longer available or not JSON: the DOM fallback covers it
+                    continue
+                if page_number is not None and payload_page(payload) not in (None, page_number):
+                    stale += 1
+                    continue
+                payloads.append(payload)
+            if payloads or not stale or loop.time() >= deadline:
+                return payloads
+
+    def discard(self, page):
+        self._responses.pop(page, None)
+        self._arrived.pop(page, None)
+        self._throttled.discard(page)
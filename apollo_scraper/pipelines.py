@@ -1,6 +1,135 @@
 # pipelines.py
+import logging
+import os
+import sqlite3
+import time
+
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.utils.conf import build_component_list
+from scrapy.utils.misc import load_object
+from twisted.internet import defer, task, threads
+from twisted.python.failure import Failure
+from twisted.python.threadpool import ThreadPool
+
+from apollo_scraper.dedup import DedupIndex, dedup_keys
+from apollo_scraper.metrics import timed_stage
+
+logger = logging.getLogger(__name__)
+
+# Custom signals: sent by SQLiteStoragePipeline with items=[...] once a batch is committed / failed
+items_stored = object()
+items_store_failed = object()
+
+
+def storage_confirms_items(settings):
+    """True if SQLiteStoragePipeline runs and sends items_stored for the items it keeps."""
+    if not settings.getbool('SQLITE_STORAGE_ENABLED', True):
+        return False
+    return any(load_object(path) is SQLiteStoragePipeline
+               for path in build_component_list(settings.getwithbase('ITEM_PIPELINES')))
+
+
+class DedupPipeline:
+    """
+    Drops people already seen in this run or any previous run.
+
+    Runs first in the chain, keyed on the normalized email and LinkedIn URL,
+    so duplicates never reach validation or storage. Backed by DedupIndex:
+    an in-memory Bloom filter in front of an exact on-disk set.
+
+    Keys are only claimed here. They are committed to the index once the item
+    is stored (items_stored, or item_scraped when SQLite storage is off), and
+    released if it is dropped further down or its write fails, so a person
+    that never made it to storage is not skipped by later runs.
+    """
+
+    def __init__(self, index, stats=None):
+        self.index = index
+        self.stats = stats
+        self.owner_prefix = str(os.getpid())
+        self.claimed = {}  # id(item) -> (item, keys, owner) until the item is stored or dropped
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('DEDUP_ENABLED', True):
+            raise NotConfigured
+        index = DedupIndex(
+            settings.get('DEDUP_INDEX_PATH', 'apollo_dedup.db'),
+            capacity=settings.getint('DEDUP_BLOOM_CAPACITY', 1000000),
+            error_rate=settings.getfloat('DEDUP_BLOOM_ERROR_RATE', 0.001),
+            shared=settings.getbool('DEDUP_SHARED'),
+        )
+        pipeline = cls(index, crawler.stats)
+        if storage_confirms_items(settings):
+            crawler.signals.connect(pipeline.items_stored, signal=items_stored)
+            crawler.signals.connect(pipeline.items_store_failed, signal=items_store_failed)
+        else:
+            crawler.signals.connect(pipeline.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(pipeline.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(pipeline.item_error, signal=signals.item_error)
+        # Closed on spider_closed rather than close_spider: storage commits its last batch in close_spider
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        # Workers of a coordinated run tag their claims, so the coordinator can clear a crashed worker's
+        self.owner_prefix = getattr(spider, 'worker_id', None) or self.owner_prefix
+        stored = self.index.open()
+        spider.logger.info(f"Dedup index {self.index.path} loaded with {stored} known keys.")
+
+    def spider_closed(self, spider):
+        if self.stats:
+            self.stats.set_value('dedup_bloom_false_positives', self.index.bloom_false_positives)
+        for _, keys, owner in self.claimed.values():
+            self.index.release(keys, owner)
+        self.claimed.clear()
+        self.index.close()
+
+    @timed_stage('pipeline.dedup')
+    def process_item(self, item, spider):
+        keys = dedup_keys(item)
+        if not keys:
+            return item
+        owner = f"{self.owner_prefix}:{id(item)}"
+        if self.index.claim(keys, owner):
+            if self.stats:
+                self.stats.inc_value('dedup_dropped_items')
+            raise DropItem(f"Duplicate person: {keys[0]}")
+        self.claimed[id(item)] = (item, keys, owner)
+        return item
+
+    def items_stored(self, items):
+        keys = []
+        for item in items:
+            claimed = self.claimed.pop(id(item), None)
+            if claimed is not None:
+                keys.extend(claimed[1])
+        if keys:
+            self.index.commit(keys)
+
+    def items_store_failed(self, items):
+        for item in items:
+            self._release(item)
+
+    def item_scraped(self, item):
+        self.items_stored([item])
+
+    def item_dropped(self, item):
+        self._release(item)
+
+    def item_error(self, item):
+        self._release(item)
+
+    def _release(self, item):
+        claimed = self.claimed.pop(id(item), None)
+        if claimed is not None:
+            self.index.release(claimed[1], claimed[2])
+
 
 class ApolloPipeline:
+    @timed_stage('pipeline.validate')
     def process_item(self, item, spider):
         """
         Processes each scraped item.
@@ -17,7 +146,167 @@ class ApolloPipeline:
         # except (ValueError, TypeError):
         #     item['employees'] = None
 
-        # You would typically save to a database here
-        # self.database_connection.insert(item)
+        # Storage happens later in the chain, see SQLiteStoragePipeline
+
+        return item
+
+
+class SQLiteStoragePipeline:
+    """
+    Buffers items and writes them to a local SQLite database in batches.
+
+    Each batch is one transaction (executemany inside BEGIN/COMMIT) instead of
+    one INSERT + commit per item. A batch is written when the buffer reaches
+    SQLITE_STORAGE_BATCH_SIZE or every SQLITE_STORAGE_FLUSH_INTERVAL seconds,
+    whichever comes first, and whatever is left is flushed in close_spider.
+    Once a batch is committed the items_stored signal is sent with its items
+    (items_store_failed if the write failed), so other components can act
+    on what is actually on disk.
+
+    With SQLITE_STORAGE_USE_EXECUTOR the writes run on a dedicated single-thread
+    pool, so the reactor never blocks on disk I/O. Items still waiting to be
+    committed are capped at SQLITE_STORAGE_MAX_BUFFER: past that, process_item
+    returns a Deferred that fires once the pending writes land, which holds
+    back item processing instead of growing memory.
+    """
+
+    FIELDS = ('name', 'title', 'company', 'email', 'phone', 'linkedin_url')
+
+    def __init__(self, db_path, batch_size=500, flush_interval=5.0, max_buffer=5000, use_executor=True, stats=None,
+                 signals=None):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.use_executor = use_executor
+        self.stats = stats
+        self.signals = signals
+
+        self.spider = None
+        self.connection = None
+        self.threadpool = None
+        self.flush_loop = None
+        self.buffer = []
+        self.buffer_items = []  # the items behind the buffered rows, for items_stored
+        self.in_flight = 0
+        self.last_write = defer.succeed(None)
 
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('SQLITE_STORAGE_ENABLED', True):
+            raise NotConfigured
+        pipeline = cls(
+            db_path=settings.get('SQLITE_STORAGE_PATH', 'apollo_people.db'),
+            batch_size=settings.getint('SQLITE_STORAGE_BATCH_SIZE', 500),
+            flush_interval=settings.getfloat('SQLITE_STORAGE_FLUSH_INTERVAL', 5.0),
+            max_buffer=settings.getint('SQLITE_STORAGE_MAX_BUFFER', 5000),
+            use_executor=settings.getbool('SQLITE_STORAGE_USE_EXECUTOR', True),
+            stats=crawler.stats,
+            signals=crawler.signals,
+        )
+        return pipeline
+
+    def open_spider(self, spider):
+        self.spider = spider
+        # The connection is only ever used by one thread at a time (the single
+        # pool thread when the executor is on), so cross-thread use is safe.
+        # The timeout covers other worker processes writing to the same file.
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS people ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            + ", ".join(f"{field} TEXT" for field in self.FIELDS)
+            + ", scraped_at REAL)"
+        )
+        self.connection.commit()
+
+        if self.use_executor:
+            self.threadpool = ThreadPool(minthreads=1, maxthreads=1, name='sqlite-storage')
+            self.threadpool.start()
+        if self.flush_interval > 0:
+            self.flush_loop = task.LoopingCall(self.flush)
+            self.flush_loop.start(self.flush_interval, now=False)
+        spider.logger.info(f"Storing items in SQLite database {self.db_path} (batch size {self.batch_size}).")
+
+    @timed_stage('pipeline.sqlite_storage')
+    def process_item(self, item, spider):
+        self.buffer.append(tuple(item.get(field) for field in self.FIELDS) + (time.time(),))
+        self.buffer_items.append(item)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        if len(self.buffer) + self.in_flight >= self.max_buffer:
+            # Buffer is full: hold this item until the queued batches are committed
+            if self.stats:
+                self.stats.inc_value('sqlite_buffer_full_waits')
+            self.flush()
+            waiter = defer.Deferred()
+            self.last_write.addBoth(self._release_item, waiter, item)
+            return waiter
         return item
+
+    @staticmethod
+    def _release_item(result, waiter, item):
+        waiter.callback(item)
+        return result
+
+    def flush(self):
+        """Writes the current buffer as one transaction. Returns a Deferred for the write."""
+        if not self.buffer:
+            return self.last_write
+        rows, self.buffer = self.buffer, []
+        items, self.buffer_items = self.buffer_items, []
+        self.in_flight += len(rows)
+        if self.threadpool is not None:
+            from twisted.internet import reactor
+            d = threads.deferToThreadPool(reactor, self.threadpool, self._write_rows, rows)
+        else:
+            d = defer.maybeDeferred(self._write_rows, rows)
+        d.addBoth(self._write_done, items)
+        # One pool thread runs writes in order, so the latest write finishing means all did
+        self.last_write = d
+        return d
+
+    def _write_rows(self, rows):
+        placeholders = ", ".join("?" for _ in range(len(self.FIELDS) + 1))
+        with self.connection:  # one transaction per batch
+            self.connection.executemany(
+                f"INSERT INTO people ({', '.join(self.FIELDS)}, scraped_at) VALUES ({placeholders})", rows
+            )
+
+    def _write_done(self, result, items):
+        count = len(items)
+        self.in_flight -= count
+        if isinstance(result, Failure):
+            logger.error(f"❌ Failed to write {count} items to {self.db_path}: {result.getErrorMessage()}")
+            if self.stats:
+                self.stats.inc_value('sqlite_write_errors')
+                self.stats.inc_value('sqlite_items_lost', count)
+        elif self.stats:
+            self.stats.inc_value('sqlite_batches_written')
+            self.stats.inc_value('sqlite_items_written', count)
+        if self.signals is not None:
+            self.signals.send_catch_log(items_store_failed if isinstance(result, Failure) else items_stored,
+                                        items=items, spider=self.spider)
+        return None
+
+    @defer.inlineCallbacks
+    def close_spider(self, spider):
+        """
+        Guaranteed final flush: nothing buffered is lost when the spider stops.
+        Done in close_spider, which the engine waits for before spider_closed,
+        so items_stored listeners see the last batch before they shut down.
+        """
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        yield self.flush()
+        yield self.last_write
+        if self.threadpool is not None:
+            self.threadpool.stop()
+            self.threadpool = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        spider.logger.info(f"SQLite storage flushed and closed: {self.db_path}.")
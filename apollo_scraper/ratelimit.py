@@ -0,0 +1,142 @@
+# ratelimit.py
+import asyncio
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
+from scrapy.utils.defer import deferred_from_coro
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (now if now is not None else time.time()))
+
+
+class RateLimitBackoff:
+    """
+    Crawl-wide backoff after the server signals a rate limit.
+
+    Every 429 (or rate-limit page) opens a throttle window: Retry-After when
+    the server sends one, otherwise base_delay * factor ** n for the n-th
+    consecutive hit, capped at max_delay. Everything that shares the session
+    (downloads through RateLimitMiddleware, page turns through RequestBudget)
+    waits for the window to close before going out again. The exponent is
+    reset by success(), which the spider calls once a results page is
+    extracted without a block. Plain transport responses don't count: the
+    search page of a re-queued term loads fine even while the results are
+    still blocked.
+    """
+
+    def __init__(self, stats, base_delay=5.0, max_delay=300.0, factor=2.0, max_retries=5):
+        self.stats = stats
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.max_retries = max_retries
+        self.consecutive = 0
+        self.blocked_until = 0.0
+
+    @classmethod
+    def from_settings(cls, settings, stats):
+        return cls(
+            stats,
+            base_delay=settings.getfloat('RATELIMIT_BASE_DELAY', 5.0),
+            max_delay=settings.getfloat('RATELIMIT_MAX_DELAY', 300.0),
+            factor=settings.getfloat('RATELIMIT_BACKOFF_FACTOR', 2.0),
+            max_retries=settings.getint('RATELIMIT_MAX_RETRIES', 5),
+        )
+
+    def hit(self, retry_after=None):
+        """Records a rate-limit signal and extends the throttle window. Returns the delay applied."""
+        if retry_after is not None:
+            delay = min(retry_after, self.max_delay)
+        else:
+            delay = min(self.base_delay * self.factor ** self.consecutive, self.max_delay)
+        self.consecutive += 1
+
+        now = time.monotonic()
+        until = now + delay
+        if until > self.blocked_until:
+            # Only the part not already covered by the current window adds throttled time
+            self.stats.inc_value('rate_limit_throttled_seconds', round(until - max(now, self.blocked_until), 3))
+            self.blocked_until = until
+        self.stats.inc_value('rate_limit_backoffs')
+        logger.warning(f"Rate limited, backing off {delay:.1f}s"
+                       f"{' (Retry-After)' if retry_after is not None else ''} (hit {self.consecutive} in a row)")
+        return delay
+
+    def success(self):
+        """Records a confirmed, non-blocked results page."""
+        self.consecutive = 0
+
+    def remaining(self):
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    async def wait(self):
+        """Sleeps until the throttle window closes (it may grow while waiting)."""
+        while self.remaining() > 0:
+            self.stats.inc_value('rate_limit_waits')
+            await asyncio.sleep(self.remaining())
+
+
+class RateLimitMiddleware:
+    """
+    Downloader middleware that honors 429 / Retry-After.
+
+    Rate-limited responses are not retried immediately (429 is left out of
+    RETRY_HTTP_CODES): the shared backoff window is extended and the request is
+    re-queued, so the page is fetched once the window closes instead of being
+    lost. Requests going out during a window wait for it first. After
+    RATELIMIT_MAX_RETRIES re-queues the response is passed on (and ends in
+    the request's errback as an HttpError).
+    """
+
+    def __init__(self, backoff, http_codes=(429,)):
+        self.backoff = backoff
+        self.http_codes = set(http_codes)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        # Shared with the spider's in-page pagination when it has one (see ApolloSpider.from_crawler)
+        backoff = getattr(crawler.spider, 'rate_limit', None)
+        if backoff is None:
+            backoff = RateLimitBackoff.from_settings(crawler.settings, crawler.stats)
+        return cls(backoff, crawler.settings.getlist('RATELIMIT_HTTP_CODES', [429]))
+
+    def process_request(self, request, spider):
+        if self.backoff.remaining() > 0:
+            return deferred_from_coro(self.backoff.wait())
+
+    def process_response(self, request, response, spider):
+        if response.status not in self.http_codes:
+            return response
+
+        self.backoff.stats.inc_value('rate_limit_responses')
+        retries = request.meta.get('rate_limit_retries', 0)
+        if retries >= self.backoff.max_retries:
+            self.backoff.stats.inc_value('rate_limit_gave_up')
+            logger.error(f"Still rate limited after {retries} re-queues, giving up on {request.url}")
+            return response
+
+        self.backoff.hit(parse_retry_after(response.headers.get('Retry-After')))
+        page = response.meta.get('playwright_page')
+        if page is not None:
+            # The re-queued request gets a fresh page
+            deferred_from_coro(page.close())
+        meta = {key: value for key, value in request.meta.items() if key != 'playwright_page'}
+        meta['rate_limit_retries'] = retries + 1
+        self.backoff.stats.inc_value('rate_limit_requeued')
+        return request.replace(meta=meta, dont_filter=True)
@@ -0,0 +1,107 @@
+# resources.py
+import re
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+# Rough average cost of one request per resource type: (bytes, milliseconds).
+# Aborted requests are never downloaded, so savings can only be estimated.
+DEFAULT_COST_ESTIMATES = {
+    'image': (40000, 60),
+    'font': (35000, 50),
+    'stylesheet': (25000, 40),
+    'media': (250000, 200),
+    'other': (5000, 20),
+}
+
+
+class ResourceFilter:
+    """
+    Decides which browser sub-requests to abort.
+
+    A request is aborted when its resource type is blocked or its URL matches
+    a blocked pattern, unless its URL matches an allowed pattern (allow wins).
+    Documents, scripts and XHR/fetch are never blocked by type, since the SPA
+    and the payload extraction mode depend on them.
+    """
+
+    NEVER_BLOCKED_TYPES = {'document', 'script', 'xhr', 'fetch', 'websocket'}
+
+    def __init__(self, blocked_types=(), blocked_url_patterns=(), allowed_url_patterns=(), cost_estimates=None, stats=None):
+        self.blocked_types = set(blocked_types) - self.NEVER_BLOCKED_TYPES
+        self.blocked_url_patterns = [re.compile(p) for p in blocked_url_patterns]
+        self.allowed_url_patterns = [re.compile(p) for p in allowed_url_patterns]
+        self.cost_estimates = dict(DEFAULT_COST_ESTIMATES, **(cost_estimates or {}))
+        self.stats = stats
+
+    @classmethod
+    def from_settings(cls, settings, stats=None):
+        return cls(
+            blocked_types=settings.getlist('RESOURCE_FILTER_BLOCKED_TYPES'),
+            blocked_url_patterns=settings.getlist('RESOURCE_FILTER_BLOCKED_URL_PATTERNS'),
+            allowed_url_patterns=settings.getlist('RESOURCE_FILTER_ALLOWED_URL_PATTERNS'),
+            cost_estimates=settings.getdict('RESOURCE_FILTER_COST_ESTIMATES'),
+            stats=stats,
+        )
+
+    def should_abort(self, request):
+        url = request.url
+        if any(pattern.search(url) for pattern in self.allowed_url_patterns):
+            return False
+        resource_type = request.resource_type
+        if resource_type in self.blocked_types or any(pattern.search(url) for pattern in self.blocked_url_patterns):
+            self._record_abort(resource_type)
+            return True
+        return False
+
+    def _record_abort(self, resource_type):
+        if not self.stats:
+            return
+        size, duration_ms = self.cost_estimates.get(resource_type, self.cost_estimates['other'])
+        self.stats.inc_value('resource_filter_aborted')
+        self.stats.inc_value(f'resource_filter_aborted/{resource_type}')
+        self.stats.inc_value('resource_filter_bytes_saved_estimate', size)
+        self.stats.inc_value('resource_filter_time_saved_estimate_ms', duration_ms)
+
+
+# Filter used by abort_request, installed by ResourceFilterExtension for the running crawl
+_active_filter = None
+
+
+def abort_request(request):
+    """PLAYWRIGHT_ABORT_REQUEST predicate: delegates to the filter of the running crawl."""
+    return _active_filter is not None and _active_filter.should_abort(request)
+
+
+class ResourceFilterExtension:
+    """
+    Builds the ResourceFilter from settings and hands it to abort_request.
+
+    scrapy-playwright calls PLAYWRIGHT_ABORT_REQUEST for every request of every
+    page it opens (the "default" context included) before the request leaves
+    the browser, but it gives the predicate no access to the crawler. This
+    extension provides the configuration and the stats object.
+    """
+
+    def __init__(self, resource_filter):
+        self.resource_filter = resource_filter
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('RESOURCE_FILTER_ENABLED'):
+            raise NotConfigured
+        ext = cls(ResourceFilter.from_settings(crawler.settings, crawler.stats))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        global _active_filter
+        _active_filter = self.resource_filter
+        spider.logger.info(f"Blocking browser resource types: {sorted(self.resource_filter.blocked_types)} "
+                           f"and {len(self.resource_filter.blocked_url_patterns)} URL patterns.")
+
+    def spider_closed(self, spider):
+        global _active_filter
+        if _active_filter is self.resource_filter:
+            _active_filter = None
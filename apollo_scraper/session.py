@@ -0,0 +1,51 @@
+# session.py
+import json
+import os
+import time
+
+
+class SessionStateCache:
+    """
+    The Playwright storage state saved after login (cookies + local storage).
+
+    check() is the offline half of the validity test: the file must exist,
+    parse, be younger than max_age and still hold unexpired cookies for the
+    Apollo domain. Only then is it worth spending a browser probe on it
+    instead of going straight to the login form.
+    """
+
+    def __init__(self, path, max_age=12 * 3600, cookie_domain='apollo.io'):
+        self.path = path
+        self.max_age = max_age
+        self.cookie_domain = cookie_domain
+
+    @classmethod
+    def from_settings(cls, path, settings):
+        return cls(path, max_age=settings.getfloat('APOLLO_SESSION_MAX_AGE', 12 * 3600))
+
+    def check(self):
+        """Returns (usable, reason)."""
+        if not os.path.exists(self.path):
+            return False, "no stored session"
+        age = time.time() - os.path.getmtime(self.path)
+        if self.max_age and age > self.max_age:
+            return False, f"stored session is {age / 3600:.1f}h old"
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            return False, f"stored session unreadable: {e}"
+
+        now = time.time()
+        cookies = [c for c in state.get('cookies', []) if c.get('domain', '').lstrip('.').endswith(self.cookie_domain)]
+        if not cookies:
+            return False, "stored session has no Apollo cookies"
+        # expires == -1 marks a session cookie, which has no expiry of its own
+        if not any(c.get('expires', -1) == -1 or c['expires'] > now for c in cookies):
+            return False, "stored session cookies have expired"
+        return True, f"stored session from {age / 60:.0f} min ago"
+
+    def invalidate(self):
+        """Deletes the stored state once a probe shows the server no longer accepts it."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,137 @@
+# snapshots.py
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """
+    On-disk store of rendered results pages, one per (search term, page).
+
+    Every page is kept as gzip-compressed HTML next to a SQLite index
+    (index.db) holding its URL, size and capture time. Snapshots older than
+    ttl seconds are dropped. Past max_bytes of compressed data, the oldest
+    ones go first. Only pages that parsed without a block are stored, and
+    when a term's crawl ends, its snapshots past the last page are pruned,
+    so a replay never mixes in pages left over from a longer, older crawl.
+    With these pages, selector fixes can be re-tested (-a from_cache=1)
+    without driving a browser against the live site.
+    """
+
+    def __init__(self, directory, ttl=7 * 24 * 3600, max_bytes=2 * 1024 ** 3, compresslevel=6):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        self.connection = None
+        self.total_size = 0  # compressed bytes indexed, kept up to date instead of summed on every store
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            settings.get('SNAPSHOT_CACHE_DIR', 'snapshots'),
+            ttl=settings.getfloat('SNAPSHOT_CACHE_TTL', 7 * 24 * 3600),
+            max_bytes=settings.getint('SNAPSHOT_CACHE_MAX_MB', 2048) * 1024 * 1024,
+        )
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(self.directory, 'index.db'), timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "term TEXT, page INTEGER, url TEXT, file TEXT, size INTEGER, stored_at REAL, "
+            "PRIMARY KEY (term, page))"
+        )
+        self.connection.commit()
+        self.total_size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM snapshots").fetchone()[0]
+        self.evict_expired()
+        return self
+
+    def store(self, term, page_number, url, body):
+        """Saves the rendered HTML (bytes) of one results page, replacing an older snapshot of it."""
+        name = f"{hashlib.sha1(term.encode('utf-8')).hexdigest()[:16]}-{page_number:04d}.html.gz"
+        path = os.path.join(self.directory, name)
+        data = gzip.compress(body, compresslevel=self.compresslevel)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        replaced = self.connection.execute("SELECT size FROM snapshots WHERE term = ? AND page = ?",
+                                           (term, page_number)).fetchone()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO snapshots (term, page, url, file, size, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (term, page_number, url, name, len(data), time.time()))
+        self.total_size += len(data) - (replaced[0] if replaced else 0)
+        if self.max_bytes:
+            self.evict_oversize()
+        return len(data)
+
+    def prune(self, term, last_page):
+        """Removes the term's snapshots past last_page (left by an earlier crawl that went further)."""
+        stale = self.connection.execute("SELECT term, page, file, size FROM snapshots WHERE term = ? AND page > ?",
+                                        (term, last_page)).fetchall()
+        self._remove(stale)
+        return len(stale)
+
+    def pages(self, term):
+        """Yields (page_number, url, body) for the term's fresh snapshots, in page order."""
+        rows = self.connection.execute(
+            "SELECT page, url, file FROM snapshots WHERE term = ? AND stored_at >= ? ORDER BY page",
+            (term, self._oldest_allowed())).fetchall()
+        for page_number, url, name in rows:
+            try:
+                with gzip.open(os.path.join(self.directory, name), 'rb') as f:
+                    body = f.read()
+            except OSError as e:
+                logger.warning(f"Snapshot {name} of '{term}' page {page_number} is unreadable: {e}")
+                continue
+            yield page_number, url, body
+
+    def evict_expired(self):
+        if not self.ttl:
+            return 0
+        expired = self.connection.execute("SELECT term, page, file, size FROM snapshots WHERE stored_at < ?",
+                                          (self._oldest_allowed(),)).fetchall()
+        self._remove(expired)
+        return len(expired)
+
+    def evict_oversize(self):
+        if self.total_size <= self.max_bytes:
+            return 0
+        total = self.total_size
+        evicted = []
+        for row in self.connection.execute("SELECT term, page, file, size FROM snapshots ORDER BY stored_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append(row)
+            total -= row[3]
+        self._remove(evicted)
+        return len(evicted)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _oldest_allowed(self):
+        return time.time() - self.ttl if self.ttl else 0
+
+    def _remove(self, rows):
+        if not rows:
+            return
+        with self.connection:
+            self.connection.executemany("DELETE FROM snapshots WHERE term = ? AND page = ?",
+                                        ((term, page_number) for term, page_number, _, _ in rows))
+        self.total_size -= sum(size for _, _, _, size in rows)
+        for _, _, name, _ in rows:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
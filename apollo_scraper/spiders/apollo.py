@@ -0,0 +1,782 @@
+# apollo_scraper/spiders/apollo.py
+
+import scrapy
+from scrapy_playwright.page import PageCoroutine
+import os
+import time
+from scrapy import signals
+from scrapy.exceptions import DropItem
+from scrapy.spiders import Request
+from twisted.internet.error import TimeoutError, DNSLookupError, ConnectionRefusedError, ConnectionLost, TCPTimedOutError
+from scrapy.spidermiddlewares.httperror import HttpError
+from scrapy.loader import ItemLoader
+from scrapy.http import HtmlResponse
+from scrapy.utils.defer import deferred_from_coro
+from apollo_scraper.items import ApolloPerson # Import your Item
+from apollo_scraper.extractors import PeopleRowExtractor
+from apollo_scraper.payloads import PayloadCapture, has_next_page, people_from_payload
+from apollo_scraper.pages import PageManager
+from apollo_scraper.streams import RequestBudget, SearchScheduler
+from apollo_scraper.checkpoint import PendingPages, SearchCheckpoint
+from apollo_scraper.dedup import DedupIndex, dedup_keys
+from apollo_scraper.session import SessionStateCache
+from apollo_scraper.metrics import record_stage, timed
+from apollo_scraper.ratelimit import RateLimitBackoff
+from apollo_scraper.parsing import BLOCK_PATTERN, ParsePool
+from apollo_scraper.workqueue import QueueScheduler, TermQueue
+from apollo_scraper.snapshots import SnapshotCache
+from apollo_scraper.pipelines import items_store_failed, items_stored, storage_confirms_items
+
+def _as_bool(value):
+    """Spider arguments arrive as strings: -a resume=1 / true / yes."""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+# True once the first result row shows something else than before the page turn
+ROWS_CHANGED_JS = "([selector, previous]) => { const row = document.querySelector(selector); return row !== null && row.innerText !== previous; }"
+
+class ApolloSpider(scrapy.Spider):
+    name = "apollo"
+    start_urls = ['https://app.apollo.io/#/login']
+
+    # TOGGLE: Set this to False to force fresh login each time
+    # This will delete the saved session state file.
+    reuse_login = True
+    login_state_file = f"{name}_login_state.json" # Session (cookies/storage) saved after login
+    # Present only when logged in; the login form's email input shows up instead when the session expired
+    logged_in_selector = 'div.sidebar-container'
+
+    # Search parameters: can be overridden via command line -a search_terms="term1,term2"
+    search_terms = ['Software Engineer', 'Data Scientist', 'Product Manager']
+
+    # Adjust these CSS selectors based on current Apollo.io HTML structure
+    people_row_selector = 'div.zp_RFed0'
+    people_field_selectors = {
+        'name': 'div.zp_xJ5S3::text', # Example: Name selector
+        'title': 'div.zp_e4xZf::text', # Example: Title selector
+        'company': 'div.zp_s6yTf::text', # Example: Company selector
+        'email': 'a[data-cy="contact-email-link"]::attr(href)', # Example: Email link
+        'phone': 'span.zp_L4R0X::text', # Example: Phone selector
+        'linkedin_url': 'a.zp_FuwzY[href*="linkedin.com/in"]::attr(href)', # Example: LinkedIn URL
+    }
+    results_container_selector = 'div.results-container'
+    # Find the next page button/link. Apollo.io might use classes or specific attributes.
+    # Example: 'a.apollo-pagination-next-button::attr(href)' or similar
+    next_page_control_selector = 'a.pagination-next, button[data-cy="pagination-next"]'
+    # Apollo.io's search UI often involves typing into a search bar.
+    # You'll need to inspect the exact selector for the search input.
+    # Example: 'input[placeholder*="job title or keyword"]' or specific class/id.
+    search_input_selector = 'input[placeholder*="job title or keyword"], input[data-cy="job-title-search-input"]' # Add more selectors if needed
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        # Settings are only bound to the spider after __init__ runs, so the
+        # settings fallback for the credentials has to be resolved here.
+        kwargs.setdefault('email', crawler.settings.get('APOLLO_EMAIL'))
+        kwargs.setdefault('password', crawler.settings.get('APOLLO_PASSWORD'))
+        kwargs.setdefault('extraction_mode', crawler.settings.get('APOLLO_EXTRACTION_MODE', 'dom'))
+        kwargs.setdefault('search_concurrency', crawler.settings.getint(
+            'APOLLO_SEARCH_CONCURRENCY', crawler.settings.getint('PLAYWRIGHT_BROWSER_POOL_SIZE', 1)))
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.fit_browser_contexts(crawler.settings)
+        if spider.from_cache:
+            spider.isolate_replay(crawler.settings)
+        spider.page_manager = PageManager(crawler.stats)
+        # Shared by RateLimitMiddleware (downloads) and the request budget (in-page turns); stats bound in bind_stats
+        spider.rate_limit = RateLimitBackoff.from_settings(crawler.settings, crawler.stats)
+        spider.request_budget = RequestBudget.from_settings(crawler.settings, spider.current_download_delay,
+                                                            backoff=spider.rate_limit)
+        # Watches the search XHRs for rate limits in both modes; only keeps the payloads in payload mode
+        spider.payload_capture = PayloadCapture(backoff=spider.rate_limit,
+                                                http_codes=crawler.settings.getlist('RATELIMIT_HTTP_CODES', [429]),
+                                                keep_payloads=spider.extraction_mode == 'payload')
+
+        # Progress is checkpointed after every stored page; -a resume=1 continues from the last checkpoint
+        checkpoint_path = crawler.settings.get('APOLLO_CHECKPOINT_PATH', f"{spider.name}_checkpoint.json")
+        if spider.resume:
+            spider.checkpoint = SearchCheckpoint.load(checkpoint_path, spider.search_terms)
+        else:
+            spider.checkpoint = SearchCheckpoint(checkpoint_path, spider.search_terms)
+        # A page only reaches the checkpoint once its items are stored, so a crash can't skip unwritten items
+        spider.pending_pages = PendingPages(spider.checkpoint)
+        if storage_confirms_items(crawler.settings):
+            crawler.signals.connect(spider.pending_pages.items_stored, signal=items_stored)
+            crawler.signals.connect(spider.pending_pages.items_store_failed, signal=items_store_failed)
+        else:
+            crawler.signals.connect(spider.pending_pages.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(spider.pending_pages.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(spider.pending_pages.item_error, signal=signals.item_error)
+        # Number of search terms crawled in parallel, each in its own browser context
+        if spider.work_queue:
+            # Worker of a coordinated run (see coordinator.py): terms come from the shared queue
+            spider.search_scheduler = QueueScheduler(TermQueue(spider.work_queue), spider.worker_id,
+                                                     spider.search_concurrency)
+            # The queue only hears a term is done once its done mark is stored, like the checkpoint
+            spider.pending_pages.on_done = spider.search_scheduler.complete
+        else:
+            spider.search_scheduler = SearchScheduler(spider.search_terms, spider.search_concurrency,
+                                                      skip=spider.checkpoint.done_terms())
+
+        # -a incremental=1 stops a term at the first page of people stored by earlier runs
+        spider.seen_index = None
+        if spider.incremental:
+            # Read-only: DedupPipeline owns the index (migrations, claims, Bloom filter), this only queries it
+            seen_index = DedupIndex(crawler.settings.get('DEDUP_INDEX_PATH', 'apollo_dedup.db'))
+            if seen_index.open_read_only():
+                spider.seen_index = seen_index
+            else:
+                spider.logger.info("No dedup index yet, so -a incremental=1 has no earlier runs to stop at.")
+            # Only keys stored before this run (before the coordinator started, for its workers) count
+            spider.seen_before = crawler.settings.getfloat('DEDUP_RUN_STARTED_AT') or time.time()
+
+        spider.session_cache = SessionStateCache.from_settings(spider.login_state_file, crawler.settings)
+        # APOLLO_PARSE_WORKERS > 0 moves the compiled row extraction off the reactor thread
+        spider.parse_pool = None
+        if crawler.settings.get('APOLLO_ROW_EXTRACTOR', 'compiled') == 'compiled':
+            spider.parse_pool = ParsePool.from_settings(crawler.settings, crawler.stats)
+        # Rendered results pages, kept for selector work and -a from_cache=1 replays
+        spider.snapshot_cache = None
+        if crawler.settings.getbool('SNAPSHOT_CACHE_ENABLED') or spider.from_cache:
+            spider.snapshot_cache = SnapshotCache.from_settings(crawler.settings).open()
+        spider.started_at = time.monotonic()
+        crawler.signals.connect(spider.record_first_item, signal=signals.item_scraped)
+        crawler.signals.connect(spider.bind_stats, signal=signals.spider_opened)
+        return spider
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Email/password from command line, falling back to settings (see from_crawler)
+        self.apollo_email = kwargs.get('email')
+        self.apollo_password = kwargs.get('password')
+
+        # Override search terms if provided via command line
+        if 'search_terms' in kwargs:
+            self.search_terms = kwargs.get('search_terms').split(',')
+            self.search_terms = [term.strip() for term in self.search_terms]
+
+        self.search_concurrency = int(kwargs.get('search_concurrency') or 1)
+        self.resume = _as_bool(kwargs.get('resume'))
+        self.incremental = _as_bool(kwargs.get('incremental'))
+        # Set by the coordinator: -a work_queue=<queue.db> -a worker_id=w0
+        self.work_queue = kwargs.get('work_queue')
+        self.worker_id = kwargs.get('worker_id') or f"pid{os.getpid()}"
+        # -a from_cache=1 parses cached snapshots only: no login, no browser pages
+        self.from_cache = _as_bool(kwargs.get('from_cache'))
+
+        # Selectors are compiled once per spider instead of once per row
+        self.people_extractor = PeopleRowExtractor(self.people_row_selector, self.people_field_selectors)
+
+        # 'dom' parses the rendered results, 'payload' reads the search XHR JSON (-a extraction_mode=payload)
+        self.extraction_mode = kwargs.get('extraction_mode') or 'dom'
+        if self.extraction_mode not in ('dom', 'payload'):
+            raise ValueError(f"Unknown extraction_mode: {self.extraction_mode!r} (expected 'dom' or 'payload')")
+
+        if not self.apollo_email or not self.apollo_password:
+            self.logger.error("Apollo.io email and password are required. Set them in settings.py or via -a email=... -a password=...")
+            raise ValueError("Missing Apollo.io credentials")
+
+    def bind_stats(self):
+        """
+        Hands the stats collector to the helpers built in from_crawler. On Scrapy 2.11 it doesn't
+        exist yet there: Crawler.crawl() creates it after the spider, before the engine opens it.
+        """
+        self.rate_limit.stats = self.crawler.stats
+        self.page_manager.stats = self.crawler.stats
+        if self.parse_pool is not None:
+            self.parse_pool.stats = self.crawler.stats
+
+    def isolate_replay(self, settings):
+        """
+        A -a from_cache=1 replay re-parses people the live run already stored, so it skips the dedup
+        index and writes the storage file, export parts and checkpoint under <SNAPSHOT_CACHE_DIR>/replay
+        instead of next to the live ones. Settings given on the command line (-s) still win.
+        """
+        if settings.frozen:
+            self.logger.warning("Settings are frozen (Scrapy < 2.11): the replay uses the live dedup index, "
+                                "storage and exports. Point DEDUP_INDEX_PATH / SQLITE_STORAGE_PATH / EXPORT_DIR "
+                                "elsewhere or pass -s DEDUP_ENABLED=False.")
+            return
+        replay_dir = os.path.join(settings.get('SNAPSHOT_CACHE_DIR', 'snapshots'), 'replay')
+        os.makedirs(replay_dir, exist_ok=True)
+        settings.set('DEDUP_ENABLED', False, priority='spider')
+        settings.set('SQLITE_STORAGE_PATH', os.path.join(replay_dir, 'apollo_people.db'), priority='spider')
+        settings.set('EXPORT_DIR', os.path.join(replay_dir, 'exports'), priority='spider')
+        settings.set('APOLLO_CHECKPOINT_PATH', os.path.join(replay_dir, f"{self.name}_checkpoint.json"),
+                     priority='spider')
+        self.logger.info(f"Replay output goes to {replay_dir} (storage {settings.get('SQLITE_STORAGE_PATH')}, "
+                         f"exports {settings.get('EXPORT_DIR')}); dedup {'on' if settings.getbool('DEDUP_ENABLED') else 'off'}.")
+
+    def fit_browser_contexts(self, settings):
+        """
+        Every search stream keeps its own context (search-<slot>) open for the whole crawl, next to the
+        login context, so PLAYWRIGHT_MAX_CONTEXTS has to allow search_concurrency + 1 of them or the
+        extra streams wait forever. Raises the limit while settings can still change (Scrapy >= 2.11
+        freezes them after from_crawler), otherwise lowers the concurrency to fit.
+        """
+        needed = self.search_concurrency + 1
+        max_contexts = settings.getint('PLAYWRIGHT_MAX_CONTEXTS')
+        if not max_contexts or max_contexts >= needed:
+            return
+        if not settings.frozen:
+            settings.set('PLAYWRIGHT_MAX_CONTEXTS', needed, priority='spider')
+        max_contexts = settings.getint('PLAYWRIGHT_MAX_CONTEXTS')
+        if max_contexts >= needed:
+            self.logger.info(f"PLAYWRIGHT_MAX_CONTEXTS raised to {needed} for {self.search_concurrency} search streams.")
+            return
+        self.search_concurrency = max(1, max_contexts - 1)
+        self.logger.warning(f"PLAYWRIGHT_MAX_CONTEXTS = {max_contexts} leaves room for {self.search_concurrency} "
+                            f"search streams next to the login context. Lowering search_concurrency to match.")
+
+    def start_requests(self):
+        if self.from_cache:
+            for request in self.cached_requests():
+                yield request
+            return
+
+        # Force fresh login by deleting session state file if reuse_login is False
+        if not self.reuse_login:
+            try:
+                state_file = self.login_state_file
+                if os.path.exists(state_file):
+                    os.remove(state_file)
+                    self.logger.info(f"🔁 Fresh login requested. Deleted stored session file: {state_file}.")
+                else:
+                    self.logger.info("🔁 Fresh login requested. No stored session found.")
+            except Exception as e:
+                self.logger.error(f"Error deleting session file: {e}")
+        else:
+            usable, reason = self.session_cache.check()
+            if usable:
+                # Cheap probe: open the app with the stored session and see if we land logged in
+                self.logger.info(f"🔁 Reusing {reason}. Checking it is still valid.")
+                yield self.session_probe_request()
+                return
+            self.logger.info(f"🔁 Can't reuse login session ({reason}).")
+
+        yield self.login_request()
+
+    def login_request(self):
+        self.logger.info(f"Attempting login to Apollo.io with email: {self.apollo_email}")
+        return scrapy.Request(
+            url=self.start_urls[0],
+            meta={
+                "playwright": True,
+                "playwright_context": "default", # Use a consistent context name for session reuse
+                "playwright_page_coroutines": [
+                    PageCoroutine("fill", 'input[name="email"]', self.apollo_email),
+                    PageCoroutine("fill", 'input[name="password"]', self.apollo_password),
+                    PageCoroutine("click", 'button[type="submit"]'),
+                    # Wait for a prominent element that appears AFTER successful login (e.g., sidebar)
+                    PageCoroutine("wait_for_selector", self.logged_in_selector, timeout=self.settings.getint('PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT'))
+                ],
+                "playwright_include_page": True, # Closed in after_login / handle_login_error
+                "metrics_started_at": time.perf_counter(),
+            },
+            callback=self.after_login,
+            errback=self.handle_login_error, # Add error handling for login request
+            dont_filter=True # May follow a failed session probe
+        )
+
+    def session_probe_request(self):
+        return scrapy.Request(
+            url="https://app.apollo.io/#/people/search",
+            meta={
+                "playwright": True,
+                "playwright_context": "default",
+                # Only used when the context is created: start it with the stored session
+                "playwright_context_kwargs": {"storage_state": self.login_state_file},
+                "playwright_page_coroutines": [
+                    # Whichever comes first: the logged-in app or the login form
+                    PageCoroutine("wait_for_selector", f'{self.logged_in_selector}, input[name="email"]',
+                                  timeout=self.settings.getint('APOLLO_SESSION_PROBE_TIMEOUT', 15000)),
+                ],
+                "playwright_include_page": True,
+                "metrics_started_at": time.perf_counter(),
+            },
+            callback=self.after_session_probe,
+            errback=self.handle_session_probe_error,
+            dont_filter=True
+        )
+
+    async def after_session_probe(self, response):
+        record_stage(self.crawler, 'session_probe', time.perf_counter() - response.meta['metrics_started_at'])
+        page = self.page_manager.register(response.meta.get("playwright_page"), stream='login')
+        try:
+            valid = await page.query_selector(self.logged_in_selector) is not None
+            if valid:
+                # Refresh the stored state with whatever the server renewed
+                await page.context.storage_state(path=self.login_state_file)
+        finally:
+            await self.page_manager.close(page)
+
+        if not valid:
+            self.logger.info("🔁 Stored session has expired. Logging in again.")
+            self.crawler.stats.inc_value('login_session_expired')
+            # Bounced to the login form: drop the file so no search context (or coordinator
+            # worker waiting for a session) starts from it if the login below fails
+            self.session_cache.invalidate()
+            yield self.login_request()
+            return
+        self.logger.info("✅ Stored session is still valid, skipping login.")
+        self.crawler.stats.inc_value('login_session_reused')
+        for request in self.start_search_streams():
+            yield request
+
+    async def handle_session_probe_error(self, failure):
+        await self.page_manager.close(failure.request.meta.get("playwright_page"))
+        self.logger.warning(f"Session probe failed ({type(failure.value).__name__}). Logging in again.")
+        self.crawler.stats.inc_value('login_session_expired')
+        return self.login_request()
+
+    async def after_login(self, response):
+        record_stage(self.crawler, 'login', time.perf_counter() - response.meta['metrics_started_at'])
+        page = self.page_manager.register(response.meta.get("playwright_page"), stream='login')
+        try:
+            self.logger.info("✅ Logged in successfully!")
+            self.crawler.stats.inc_value('login_successful')
+            # Store login state so the search stream contexts (and future runs) share the session
+            await page.context.storage_state(path=self.login_state_file)
+        finally:
+            # The session lives in the browser context, the login page itself is no longer needed
+            await self.page_manager.close(page)
+        for request in self.start_search_streams():
+            yield request
+
+    def cached_requests(self):
+        """One local request per search term, replaying its snapshots in parse_cached_term."""
+        self.logger.info(f"Replaying cached snapshots from {self.snapshot_cache.directory} for {len(self.search_terms)} search terms.")
+        for search_query in self.search_terms:
+            # data: URLs are served by Scrapy itself, nothing goes over the network
+            yield scrapy.Request("data:,", callback=self.parse_cached_term, meta={"search_term": search_query}, dont_filter=True)
+
+    def parse_cached_term(self, response):
+        """Runs parse_people over the cached pages of one search term (-a from_cache=1)."""
+        search_query = response.meta["search_term"]
+        replayed = 0
+        for page_number, url, body in self.snapshot_cache.pages(search_query):
+            rendered = HtmlResponse(url=url, body=body, encoding='utf-8', request=response.request)
+            for item in self.parse_people(rendered):
+                yield item
+            del rendered, body
+            replayed += 1
+        self.crawler.stats.inc_value('snapshot_pages_replayed', replayed)
+        if replayed:
+            self.logger.info(f"Replayed {replayed} cached pages of '{search_query}'")
+        else:
+            self.logger.warning(f"No cached snapshots for '{search_query}' (missing or older than SNAPSHOT_CACHE_TTL).")
+
+    def start_search_streams(self):
+        """Starts one search stream per slot."""
+        for slot in range(self.search_scheduler.max_streams):
+            yield self.start_search_iteration(slot)
+
+    def record_first_item(self, item, response, spider):
+        if self.crawler.stats.get_value('time_to_first_item_seconds') is None:
+            self.crawler.stats.set_value('time_to_first_item_seconds', round(time.monotonic() - self.started_at, 3))
+
+    def start_search_iteration(self, slot=0):
+        """Initiates a search based on the next search term, in the given stream slot."""
+        # The slot's previous term (if any) is done once it asks for a new one
+        self.search_scheduler.finish(slot)
+        next_term = self.search_scheduler.next_term(slot)
+        if next_term is not None:
+            index, search_query = next_term
+            self.logger.info(f"Starting search for job title/keyword: '{search_query}' (Iteration {index + 1}/{len(self.search_terms)}, stream {slot})")
+            return self.search_request(search_query, slot)
+        elif self.search_scheduler.done:
+            self.logger.info("🏁 All search iterations completed. Spider finished.")
+            self.crawler.stats.inc_value('total_search_iterations_completed', self.search_scheduler.finished)
+
+    def search_request(self, search_query, slot, rate_limit_retries=0):
+        meta = self.search_meta(search_query, slot, [
+            # Wait for the search input to be present and visible
+            PageCoroutine("wait_for_selector", self.search_input_selector, timeout=60000),
+        ])
+        meta["rate_limit_retries"] = rate_limit_retries
+        return scrapy.Request(
+            url="https://app.apollo.io/#/people/search", # Ensure you're on the people search page
+            meta=meta,
+            callback=self.parse_search_stream,
+            errback=self.handle_page_error, # Error handling for search page requests
+            dont_filter=True # Every term uses the same URL, don't let the dupefilter drop them
+        )
+
+    def search_meta(self, search_query, slot, page_coroutines):
+        """Playwright meta for a search stream request."""
+        meta = {
+            "playwright": True,
+            # One context per stream slot, so streams don't share tabs, cache or pagination state
+            "playwright_context": f"search-{slot}",
+            "playwright_page_coroutines": page_coroutines,
+            "playwright_include_page": True, # The stream paginates in this page, see parse_search_stream
+            "search_term": search_query,
+            "search_slot": slot,
+        }
+        if os.path.exists(self.login_state_file):
+            # Only used when the context is created: start it logged in
+            meta["playwright_context_kwargs"] = {"storage_state": self.login_state_file}
+        # The handler is attached before navigation, so no search response is missed
+        meta["playwright_page_event_handlers"] = {"response": self.payload_capture.handle_response}
+        return meta
+
+    async def parse_search_stream(self, response):
+        """
+        Runs one search term in a single long-lived page: submits the search,
+        then extracts each results page and clicks "next" in place instead of
+        navigating to every page with a new request. The page is closed when
+        the stream ends, whatever the outcome.
+        """
+        search_query = response.meta["search_term"]
+        page = self.page_manager.register(response.meta["playwright_page"], stream=search_query)
+        resume_after = self.pending_pages.last_page(search_query)
+        page_number = resume_after + 1
+        rate_limited = backed_off = False
+        try:
+            with timed(self.crawler, 'search_submit'):
+                # Fill the search input with the current query
+                await page.fill(self.search_input_selector, search_query)
+                # Simulate pressing Enter to trigger the search
+                await page.press(self.search_input_selector, "Enter")
+
+            more_pages = True
+            if resume_after:
+                # Also how a rate-limited term picks up again after its last extracted page
+                self.logger.info(f"Resuming '{search_query}' after page {resume_after} (from checkpoint)")
+                self.crawler.stats.inc_value('resumed_search_terms')
+                if not await self.skip_pages(page, resume_after):
+                    more_pages = False
+                    if self.payload_capture.throttled(page):
+                        rate_limited = backed_off = True
+                    else:
+                        self.logger.info(f"'{search_query}' has no pages left after page {resume_after}.")
+                        self.finish_term(search_query, resume_after)
+
+            while more_pages:
+                people, blocked, more_expected = await self.extract_results_page(page, response, page_number)
+                if blocked:
+                    rate_limited = True
+                    # A rate-limited search XHR has already extended the backoff (with its Retry-After)
+                    backed_off = self.payload_capture.throttled(page)
+                    break
+                # Only a results page that isn't blocked ends a run of rate limits
+                self.rate_limit.success()
+                # Registered before the items go out: storage may confirm them while they are yielded
+                self.pending_pages.add_page(search_query, page_number, people)
+                for item in people:
+                    yield item
+                if self.incremental and self.all_seen_before(people):
+                    self.logger.info(f"Page {page_number} of '{search_query}' only has people from earlier runs. Stopping this term (incremental mode).")
+                    self.crawler.stats.inc_value('incremental_terms_stopped')
+                    self.finish_term(search_query, page_number, 'incremental')
+                    break
+                if not await self.turn_page(page, more_expected):
+                    self.logger.info(f"No next page after page {page_number} of '{search_query}'. Moving to next search term or finishing.")
+                    self.crawler.stats.inc_value('pagination_end_reached')
+                    self.finish_term(search_query, page_number)
+                    break
+                page_number += 1
+                self.logger.info(f"Moved to page {page_number} of '{search_query}'")
+                self.crawler.stats.inc_value('pagination_links_followed')
+        except Exception as e:
+            self.logger.error(f"❌ Search stream for '{search_query}' failed on page {page_number}: {type(e).__name__}: {e}")
+            self.crawler.stats.inc_value('search_stream_errors')
+        finally:
+            self.payload_capture.discard(page)
+            await self.page_manager.close(page)
+
+        if rate_limited:
+            yield self.requeue_rate_limited(response.meta, backed_off)
+            return
+        # If no more pages for the current search, start the next search iteration in this stream
+        yield self.start_search_iteration(response.meta["search_slot"])
+
+    def finish_term(self, search_query, last_page, reason='finished'):
+        """Marks a term done (once its pages are stored) and drops its snapshots past the last page crawled."""
+        if self.work_queue:
+            self.search_scheduler.completing(search_query)
+        self.pending_pages.add_done(search_query, reason)
+        if self.snapshot_cache is not None:
+            pruned = self.snapshot_cache.prune(search_query, last_page)
+            self.crawler.stats.inc_value('snapshot_pages_pruned', pruned)
+
+    def requeue_rate_limited(self, meta, backed_off=False):
+        """
+        Re-queues a term whose page showed a rate-limit message. The request
+        waits out the shared backoff in RateLimitMiddleware and then resumes
+        after the last extracted page, so the blocked page isn't lost.
+        """
+        search_query, slot = meta["search_term"], meta["search_slot"]
+        retries = meta.get("rate_limit_retries", 0)
+        if retries >= self.rate_limit.max_retries:
+            self.logger.error(f"'{search_query}' still rate limited after {retries} re-queues. Moving on.")
+            self.crawler.stats.inc_value('rate_limit_gave_up')
+            return self.start_search_iteration(slot)
+        if not backed_off:
+            self.rate_limit.hit()
+        self.crawler.stats.inc_value('rate_limit_requeued')
+        return self.search_request(search_query, slot, rate_limit_retries=retries + 1)
+
+    def parse_people(self, response):
+        """Parses the people search results page."""
+        people, _ = self.extract_people(response)
+        for item in people:
+            yield item
+        # Pagination happens in the live page, see parse_search_stream / turn_page
+
+    def extract_people(self, response):
+        """parse_people as a list. Returns (people, blocked), so callers don't scan the page for a block again."""
+        self.logger.info(f"Parsing people results from: {response.url}")
+
+        if self.is_blocked(response):
+            self.logger.critical(f"⚠️ Detected access denied or rate limit on {response.url}. Please check your proxy, delays, or reconsider scraping frequency.")
+            self.crawler.stats.inc_value('rate_limit_detected')
+            return [], True # Stop processing this page
+
+        # APOLLO_ROW_EXTRACTOR = 'itemloader' switches back to the per-row ItemLoader path
+        if self.settings.get('APOLLO_ROW_EXTRACTOR', 'compiled') == 'itemloader':
+            people = self.load_people_with_itemloader(response)
+        else:
+            people = [ApolloPerson(fields) for fields in self.people_extractor.extract(response)]
+
+        if not people:
+            self.logger.warning(f"No contact rows found on page: {response.url}. Check selectors or if page is empty.")
+            self.crawler.stats.inc_value('empty_people_page_count')
+            # You might want to yield an empty item or just log and continue
+            # yield {"url": response.url, "error": "No people found"}
+
+        extracted = []
+        for item in people:
+            if item:
+                extracted.append(item)
+            else:
+                self.logger.debug(f"Skipping empty item from {response.url} - potential parsing issue.")
+
+        self.crawler.stats.inc_value('extracted_people_count', len(extracted))
+        self.logger.info(f"Extracted {len(extracted)} people from {response.url}")
+        return extracted, False
+
+    async def extract_results_page(self, page, response, page_number=None):
+        """
+        Extracts the people currently shown in a live page.
+        Returns (people, blocked, more_expected); more_expected is None when unknown.
+        """
+        if self.extraction_mode == 'payload':
+            with timed(self.crawler, 'results_wait'):
+                payloads = await self.payload_capture.collect(page, timeout=self.settings.getfloat('APOLLO_PAYLOAD_TIMEOUT', 30),
+                                                              page_number=page_number)
+            if self.payload_capture.throttled(page):
+                return self.throttled_page(page)
+            if payloads:
+                self.crawler.stats.inc_value('payload_pages_captured')
+                people = [item for payload in payloads for item in people_from_payload(payload)]
+                self.crawler.stats.inc_value('extracted_people_count', len(people))
+                self.logger.info(f"Extracted {len(people)} people from search payload on {page.url}")
+                # More pages if any payload says so; None (let the DOM decide) if none of them knows
+                known = [more for more in map(has_next_page, payloads) if more is not None]
+                more_expected = any(known) if known else None
+                return people, False, more_expected
+            self.logger.warning(f"No search payload captured on {page.url}. Falling back to the rendered page.")
+            self.crawler.stats.inc_value('payload_fallback_to_dom')
+
+        with timed(self.crawler, 'results_wait'):
+            # Wait for the results container to load
+            await page.wait_for_selector(self.results_container_selector, timeout=self.settings.getint('PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT'))
+            if self.parse_pool is not None:
+                body = (await page.content()).encode('utf-8')
+            else:
+                rendered = await self.rendered_response(page, response)
+                body = rendered.body
+        with timed(self.crawler, 'parse_people'):
+            if self.parse_pool is not None:
+                people, blocked, more_expected = await self.parse_people_offloaded(page.url, body)
+            else:
+                people, blocked = self.extract_people(rendered)
+                more_expected = None
+                # Nothing else refers to the page (the extractor doesn't cache a selector on it), so it goes right away
+                del rendered
+        if not blocked and self.payload_capture.throttled(page):
+            # The rows shown may be the previous page's: the XHR for this one was refused
+            return self.throttled_page(page)
+        # Stored once parsed, so a block page never replaces a good snapshot
+        if self.snapshot_cache is not None and page_number is not None and not blocked:
+            size = self.snapshot_cache.store(response.meta["search_term"], page_number, page.url, body)
+            self.crawler.stats.inc_value('snapshot_pages_stored')
+            self.crawler.stats.inc_value('snapshot_bytes_stored', size)
+        return people, blocked, more_expected
+
+    def throttled_page(self, page):
+        self.logger.critical(f"⚠️ Search request rate limited on {page.url}. Backing off and re-queueing the term.")
+        self.crawler.stats.inc_value('rate_limit_detected')
+        return [], True, None
+
+    async def parse_people_offloaded(self, url, body):
+        """parse_people on the parse pool: same items, logs and stats, parsed in a worker process."""
+        self.logger.info(f"Parsing people results from: {url}")
+        rows, blocked = await self.parse_pool.parse(body, self.people_row_selector, self.people_field_selectors)
+        if blocked:
+            self.logger.critical(f"⚠️ Detected access denied or rate limit on {url}. Please check your proxy, delays, or reconsider scraping frequency.")
+            self.crawler.stats.inc_value('rate_limit_detected')
+            return [], True, None
+
+        people = [ApolloPerson(fields) for fields in rows if fields]
+        if not people:
+            self.logger.warning(f"No contact rows found on page: {url}. Check selectors or if page is empty.")
+            self.crawler.stats.inc_value('empty_people_page_count')
+        self.crawler.stats.inc_value('extracted_people_count', len(people))
+        self.logger.info(f"Extracted {len(people)} people from {url}")
+        return people, False, None
+
+    async def turn_page(self, page, more_expected=None):
+        """
+        Clicks "next" in the live page. Returns False on the last page.
+        In DOM mode it also waits until other rows are displayed, since the
+        results container itself stays in place between pages.
+        """
+        if more_expected is False:
+            return False
+        timeout_ms = self.settings.getint('PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT')
+        if more_expected:
+            # The payload says there is a next page, but the control may still be rendering
+            try:
+                await page.wait_for_selector(self.next_page_control_selector, timeout=timeout_ms)
+            except Exception:
+                self.logger.debug(f"Next page control did not appear on {page.url}")
+
+        next_control = await page.query_selector(self.next_page_control_selector)
+        if next_control is None or not await next_control.is_enabled():
+            return False
+        if self.extraction_mode == 'payload':
+            # A payload that came in after this page was extracted (e.g. after a DOM fallback)
+            # belongs to it, not to the next one
+            self.payload_capture.discard(page)
+            async with self.request_budget.acquire():
+                with timed(self.crawler, 'page_turn'):
+                    await next_control.click()
+            return True
+
+        first_row = await page.query_selector(self.people_row_selector)
+        previous_first_row = await first_row.inner_text() if first_row else ''
+        async with self.request_budget.acquire():
+            with timed(self.crawler, 'page_turn'):
+                await next_control.click()
+                try:
+                    await page.wait_for_function(ROWS_CHANGED_JS, arg=[self.people_row_selector, previous_first_row], timeout=timeout_ms)
+                except Exception:
+                    if not self.payload_capture.throttled(page):
+                        raise
+                    # The rows never change when the search XHR was refused; extract_results_page reports it
+        return True
+
+    async def skip_pages(self, page, count):
+        """Pages forward past results a previous run already extracted. Returns False if they ran out."""
+        for skipped in range(1, count + 1):
+            if self.extraction_mode == 'payload':
+                # Drop the skipped page's payload so it isn't mistaken for the next one
+                await self.payload_capture.collect(page, timeout=self.settings.getfloat('APOLLO_PAYLOAD_TIMEOUT', 30),
+                                                   page_number=skipped)
+                if self.payload_capture.throttled(page):
+                    return False
+                more_expected = True
+            else:
+                await page.wait_for_selector(self.results_container_selector, timeout=self.settings.getint('PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT'))
+                more_expected = None
+            if not await self.turn_page(page, more_expected):
+                return False
+            self.crawler.stats.inc_value('resume_pages_skipped')
+        return True
+
+    def all_seen_before(self, people):
+        """True if every identifiable person on the page is in the dedup index from earlier runs."""
+        keyed = [keys for keys in (dedup_keys(item) for item in people) if keys]
+        if self.seen_index is None:
+            return False
+        return bool(keyed) and all(self.seen_index.seen(keys, before=self.seen_before) for keys in keyed)
+
+    def current_download_delay(self):
+        """Largest delay the downloader (AutoThrottle) currently applies, used to pace page turns."""
+        slots = self.crawler.engine.downloader.slots
+        return max((slot.delay for slot in slots.values()), default=self.settings.getfloat('DOWNLOAD_DELAY'))
+
+    async def rendered_response(self, page, response):
+        """Current DOM of a live page as an HtmlResponse, for the CSS parsing path."""
+        return HtmlResponse(url=page.url, body=await page.content(), encoding='utf-8', request=response.request)
+
+    def is_blocked(self, response):
+        """Basic check for common blocking messages (customize BLOCK_MARKERS in parsing.py)."""
+        return BLOCK_PATTERN.search(response.text) is not None
+
+    def closed(self, reason):
+        if self.seen_index is not None:
+            self.seen_index.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self.snapshot_cache is not None:
+            self.snapshot_cache.close()
+        # Pages still registered here were leaked by an unexpected exit path
+        return deferred_from_coro(self.page_manager.close_all())
+
+    def load_people_with_itemloader(self, response):
+        """Reference extraction path: one ItemLoader per row. Slower, kept for comparison."""
+        people = []
+        for person in response.css(self.people_row_selector):
+            loader = ItemLoader(item=ApolloPerson(), selector=person)
+            for field_name, css in self.people_field_selectors.items():
+                loader.add_css(field_name, css)
+            people.append(loader.load_item())
+        return people
+
+    async def handle_login_error(self, failure):
+        """Handles errors specifically during the login request."""
+        await self.page_manager.close(failure.request.meta.get("playwright_page"))
+        self.crawler.stats.inc_value('login_errors')
+        self.logger.error(f"❌ Login failed! Request URL: {failure.request.url}. Error: {repr(failure)}")
+
+        if failure.check(HttpError):
+            response = failure.value.response
+            self.logger.error(f"Login HTTP Error: Status {response.status}, Body: {response.text[:500]}...") # Log part of response body
+            if response.status == 401 or response.status == 403:
+                self.logger.critical("Login credentials likely incorrect or blocked. Please verify your email/password.")
+        elif failure.check(TimeoutError, TCPTimedOutError):
+            self.logger.error("Login request timed out. Network issue or server too slow.")
+        elif failure.check(ConnectionRefusedError, ConnectionLost, DNSLookupError):
+            self.logger.error("Login connection error. Check internet connection or proxy settings.")
+        else:
+            self.logger.error(f"Unhandled login error type: {type(failure.value).__name__}: {failure.value}")
+
+        # Optionally, you might want to stop the spider on critical login failure
+        # self.crawler.engine.close_spider(self, 'login_failed')
+
+
+    async def handle_page_error(self, failure):
+        """Generic error handler for subsequent page requests."""
+        request = failure.request
+        await self.page_manager.close(request.meta.get("playwright_page"))
+        self.crawler.stats.inc_value('page_request_errors')
+        self.logger.error(f"❌ Error processing {request.url}. Failure: {repr(failure)}")
+
+        # Log details based on error type
+        if failure.check(HttpError):
+            response = failure.value.response
+            self.logger.error(f"HTTP Error {response.status} on {request.url}. Body: {response.text[:500]}...")
+            if response.status == 429: # Too Many Requests
+                # Only reached once RateLimitMiddleware has used up RATELIMIT_MAX_RETRIES re-queues
+                self.logger.warning(f"Rate limited on {request.url}. Consider increasing DOWNLOAD_DELAY or improving proxy rotation.")
+                self.crawler.stats.inc_value('rate_limit_hit_during_scrape')
+            elif response.status in [401, 403]: # Unauthorized/Forbidden
+                self.logger.error(f"Access denied or session expired on {request.url}. Might need fresh login.")
+                self.crawler.stats.inc_value('access_denied_error')
+                # Consider attempting a fresh login if this happens frequently
+        elif failure.check(TimeoutError, TCPTimedOutError):
+            self.logger.warning(f"Request timed out for {request.url}. Network or site slowness.")
+            self.crawler.stats.inc_value('request_timeout')
+        elif failure.check(ConnectionRefusedError, ConnectionLost, DNSLookupError):
+            self.logger.warning(f"Connection error for {request.url}. Network or proxy issue.")
+            self.crawler.stats.inc_value('connection_error')
+        else:
+            self.logger.error(f"Unhandled error type on {request.url}: {type(failure.value).__name__}: {failure.value}")
+
+        # If it's a non-critical error, you might want to re-schedule the request
+        # yield request.copy(dont_filter=True) # Reschedule, but be careful not to loop infinitely on persistent errors
+
+        # A failed search request ends that term; keep its stream going with the next one
+        if "search_slot" in request.meta:
+            return self.start_search_iteration(request.meta["search_slot"])
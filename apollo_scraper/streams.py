@@ -0,0 +1,84 @@
+# streams.py
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class SearchScheduler:
+    """
+    Hands out search terms to a fixed number of concurrent search streams.
+
+    Each stream is a slot with its own browser context and works through one
+    term at a time (its own pagination cursor lives in the stream callback).
+    When a stream finishes a term it asks for the next pending one, so the
+    number of terms in flight never exceeds max_streams.
+    """
+
+    def __init__(self, search_terms, max_streams, skip=()):
+        self.total = len(search_terms)
+        # Terms in `skip` (e.g. finished in a checkpointed run) are never handed out
+        self.pending = deque((index, term) for index, term in enumerate(search_terms) if term not in skip)
+        self.max_streams = max(1, min(max_streams, len(self.pending) or 1))
+        self.active = {}
+        self.finished = self.total - len(self.pending)
+
+    def next_term(self, slot):
+        """Assigns the next pending term to a slot. Returns (index, term) or None."""
+        if not self.pending:
+            return None
+        self.active[slot] = self.pending.popleft()
+        return self.active[slot]
+
+    def finish(self, slot):
+        if self.active.pop(slot, None) is not None:
+            self.finished += 1
+
+    @property
+    def done(self):
+        return not self.pending and not self.active
+
+
+class RequestBudget:
+    """
+    Global budget for the page turns search streams make inside live pages.
+
+    Those clicks bypass Scrapy's downloader, so neither CONCURRENT_REQUESTS nor
+    AutoThrottle sees them. Every turn takes a slot from a shared semaphore
+    and turns are spaced by the delay returned by delay_source (the download
+    delay AutoThrottle currently applies), across all streams. With a
+    RateLimitBackoff, no turn starts while its throttle window is open.
+    """
+
+    def __init__(self, max_concurrency, delay_source=None, backoff=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.delay_source = delay_source
+        self.backoff = backoff
+        self._semaphore = None
+        self._next_start = 0.0
+
+    @classmethod
+    def from_settings(cls, settings, delay_source=None, backoff=None):
+        if settings.getint('APOLLO_PAGE_TURN_CONCURRENCY'):
+            concurrency = settings.getint('APOLLO_PAGE_TURN_CONCURRENCY')
+        elif settings.getbool('AUTOTHROTTLE_ENABLED'):
+            concurrency = int(settings.getfloat('AUTOTHROTTLE_TARGET_CONCURRENCY', 1.0))
+        else:
+            concurrency = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN', 8)
+        return cls(concurrency, delay_source, backoff)
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._semaphore is None:
+            # Created lazily so it binds to the reactor's running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            if self.backoff is not None:
+                await self.backoff.wait()
+            delay = self.delay_source() if self.delay_source else 0
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
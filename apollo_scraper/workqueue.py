@@ -0,0 +1,142 @@
+# workqueue.py
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+class TermQueue:
+    """
+    Search terms shared by several crawler processes, in a local SQLite file.
+
+    Each term is pending, claimed (by one worker), done or failed. claim()
+    runs in an IMMEDIATE transaction, so two workers can never take the same
+    term. Terms claimed by a worker that died go back to pending with
+    release(), and a term whose crawl failed goes back with fail(), until it
+    has failed max_failures times.
+    """
+
+    def __init__(self, path, max_failures=3):
+        self.path = path
+        self.max_failures = max_failures
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS terms ("
+            "term TEXT PRIMARY KEY, idx INTEGER, status TEXT NOT NULL DEFAULT 'pending', "
+            "worker TEXT, claimed_at REAL, finished_at REAL, failures INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(terms)")}
+        if 'failures' not in columns:  # queue from before failed terms were retried
+            self.connection.execute("ALTER TABLE terms ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+
+    def populate(self, search_terms):
+        """Adds terms not in the queue yet (terms from an earlier run keep their status)."""
+        with self._transaction():
+            self.connection.executemany("INSERT OR IGNORE INTO terms (term, idx) VALUES (?, ?)",
+                                        ((term, index) for index, term in enumerate(search_terms)))
+
+    def claim(self, worker):
+        """Takes the next pending term for a worker. Returns (index, term) or None."""
+        with self._transaction():
+            row = self.connection.execute(
+                "SELECT idx, term FROM terms WHERE status = 'pending' ORDER BY idx LIMIT 1").fetchone()
+            if row is not None:
+                self.connection.execute("UPDATE terms SET status = 'claimed', worker = ?, claimed_at = ? WHERE term = ?",
+                                        (worker, time.time(), row[1]))
+        return tuple(row) if row is not None else None
+
+    def complete(self, term):
+        with self._transaction():
+            self.connection.execute("UPDATE terms SET status = 'done', finished_at = ? WHERE term = ?",
+                                    (time.time(), term))
+
+    def fail(self, term):
+        """Puts a term whose crawl failed back to pending, or marks it failed after max_failures tries."""
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE terms SET failures = failures + 1, worker = NULL, "
+                "status = CASE WHEN failures + 1 >= ? THEN 'failed' ELSE 'pending' END WHERE term = ?",
+                (self.max_failures, term))
+
+    def release(self, worker=None):
+        """Puts the terms a worker (or any worker) still holds back to pending. Returns how many."""
+        with self._transaction():
+            if worker is None:
+                cursor = self.connection.execute(
+                    "UPDATE terms SET status = 'pending', worker = NULL WHERE status = 'claimed'")
+            else:
+                cursor = self.connection.execute(
+                    "UPDATE terms SET status = 'pending', worker = NULL WHERE status = 'claimed' AND worker = ?",
+                    (worker,))
+        return cursor.rowcount
+
+    def counts(self):
+        counts = {'pending': 0, 'claimed': 0, 'done': 0, 'failed': 0}
+        counts.update(self.connection.execute("SELECT status, COUNT(*) FROM terms GROUP BY status").fetchall())
+        return counts
+
+    def total(self):
+        return self.connection.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so a claim's SELECT and UPDATE can't interleave
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+
+class QueueScheduler:
+    """
+    SearchScheduler counterpart for worker processes: terms are claimed from
+    a shared TermQueue instead of a local list, so a worker keeps taking work
+    until the queue is empty, however the terms are spread over workers.
+
+    A term is only completed in the queue once its done mark is stored, i.e.
+    after the storage batch with its last items is committed (complete(),
+    called through PendingPages). Until then it stays claimed, so if the
+    worker dies, the coordinator hands it out again. A term whose stream
+    ended without a done mark (an error, rate limits given up on) goes back
+    to the queue.
+    """
+
+    def __init__(self, queue, worker, max_streams):
+        self.queue = queue
+        self.worker = worker
+        self.max_streams = max(1, max_streams)
+        self.total = queue.total()
+        self.active = {}
+        self.completing_terms = set()
+        self.finished = 0
+
+    def next_term(self, slot):
+        claimed = self.queue.claim(self.worker)
+        if claimed is not None:
+            self.active[slot] = claimed
+        return claimed
+
+    def finish(self, slot):
+        claimed = self.active.pop(slot, None)
+        if claimed is not None and claimed[1] not in self.completing_terms:
+            self.queue.fail(claimed[1])
+
+    def completing(self, term):
+        """The term's stream ended with a done mark, which complete() confirms once stored."""
+        self.completing_terms.add(term)
+
+    def complete(self, term):
+        self.completing_terms.discard(term)
+        self.queue.complete(term)
+        self.finished += 1
+
+    @property
+    def done(self):
+        # Only asked after next_term() came back empty
+        return not self.active
@@ -0,0 +1,278 @@
+# benchmarks/replay_benchmark.py
+"""
+Offline replay benchmark for ApolloSpider.parse_people and the item pipelines.
+
+Saved result pages (benchmarks/fixtures/*.html) are served by a local stand-in
+HTTP server, fetched once, and then replayed through parse_people and every
+pipeline in ITEM_PIPELINES for a number of rounds. No browser, login or live
+site is involved, so numbers are stable enough to compare between commits.
+With --mode payload, recorded search payloads (benchmarks/fixtures/payloads/*.json)
+are replayed through people_from_payload instead.
+
+Usage (from the project root; settings.py is found through SCRAPY_SETTINGS_MODULE,
+which defaults to "settings" here):
+    PYTHONPATH=. python benchmarks/replay_benchmark.py
+    PYTHONPATH=. python benchmarks/replay_benchmark.py --rounds 200 --json
+    PYTHONPATH=. python benchmarks/replay_benchmark.py --fixtures path/to/saved/pages --no-pipelines
+    PYTHONPATH=. python benchmarks/replay_benchmark.py -s APOLLO_ROW_EXTRACTOR=itemloader
+    PYTHONPATH=. python benchmarks/replay_benchmark.py --mode payload
+    PYTHONPATH=. python benchmarks/replay_benchmark.py --keep-dedup
+
+Every round starts with an empty dedup index, so each one stores the same
+people instead of dropping them as duplicates of the round before. With
+--keep-dedup, rounds after the first time the duplicate path instead.
+"""
+
+import argparse
+import functools
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+
+from apollo_scraper.dedup import DedupIndex
+from apollo_scraper.payloads import people_from_payload
+from apollo_scraper.pipelines import DedupPipeline
+from apollo_scraper.spiders.apollo import ApolloSpider
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_PAYLOAD_FIXTURES_DIR = os.path.join(DEFAULT_FIXTURES_DIR, 'payloads')
+FIXTURE_SUFFIXES = {'dom': '.html', 'payload': '.json'}
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory):
+    """Starts a local HTTP server for the fixture directory on a free port."""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def fetch_pages(server, directory, suffix='.html'):
+    """Downloads every fixture with the given suffix once through the stand-in server."""
+    host, port = server.server_address[:2]
+    pages = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(suffix):
+            continue
+        url = f"http://{host}:{port}/{filename}"
+        with urllib.request.urlopen(url) as resp:
+            pages.append((url, resp.read()))
+    return pages
+
+
+def build_pipelines(crawler, enabled=True):
+    """Instantiates ITEM_PIPELINES in priority order, like Scrapy's ItemPipelineManager."""
+    if not enabled:
+        return []
+    pipelines = []
+    configured = crawler.settings.getdict('ITEM_PIPELINES')
+    for path, priority in sorted(configured.items(), key=lambda kv: kv[1]):
+        if priority is None:
+            continue
+        pipeline_cls = load_object(path)
+        try:
+            if hasattr(pipeline_cls, 'from_crawler'):
+                pipelines.append(pipeline_cls.from_crawler(crawler))
+            else:
+                pipelines.append(pipeline_cls())
+        except NotConfigured:  # disabled, e.g. -s EXPORT_ENABLED=False
+            continue
+    return pipelines
+
+
+def reset_dedup(pipelines, round_no):
+    """Gives DedupPipeline a new, empty index (in the benchmark's working directory) for the round."""
+    for pipeline in pipelines:
+        if not isinstance(pipeline, DedupPipeline):
+            continue
+        old = pipeline.index
+        old.close()
+        pipeline.index = DedupIndex(f"bench-dedup-{round_no}.db", capacity=old.capacity,
+                                    error_rate=old.error_rate, batch_size=old.batch_size, mmap_size=old.mmap_size)
+        pipeline.index.open()
+        pipeline.claimed.clear()
+
+
+def run_pipelines(pipelines, item, spider):
+    """Runs one item through the pipeline chain. Returns None if it was dropped."""
+    for pipeline in pipelines:
+        try:
+            item = pipeline.process_item(item, spider)
+        except DropItem:
+            return None
+    return item
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def peak_rss_bytes():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def load_settings(settings_overrides):
+    # The project has no scrapy.cfg, so point Scrapy at settings.py directly
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'settings')
+    settings = get_project_settings()
+    settings.set('LOG_FILE', None)
+    settings.set('LOG_ENABLED', False)
+    # No reactor runs here, and the imports above already installed Twisted's default one,
+    # so get_crawler() must not check it against the project's AsyncioSelectorReactor
+    settings.set('TWISTED_REACTOR', None)
+    # No reactor runs here, so storage writes have to happen inline to be measured
+    settings.set('SQLITE_STORAGE_USE_EXECUTOR', False)
+    for key, value in settings_overrides.items():
+        settings.set(key, value)
+    return settings
+
+
+def run_benchmark(settings, fixtures_dir, rounds, warmup, use_pipelines, mode='dom', keep_dedup=False):
+    crawler = get_crawler(ApolloSpider, settings.copy_to_dict())
+    spider = ApolloSpider.from_crawler(crawler, email='benchmark@example.com', password='benchmark')
+    crawler.spider = spider
+    pipelines = build_pipelines(crawler, use_pipelines)
+
+    server = serve_fixtures(fixtures_dir)
+    try:
+        pages = fetch_pages(server, fixtures_dir, FIXTURE_SUFFIXES[mode])
+    finally:
+        server.shutdown()
+    if not pages:
+        raise SystemExit(f"No {FIXTURE_SUFFIXES[mode]} fixtures found in {fixtures_dir}")
+
+    def parse_page(url, body):
+        if mode == 'payload':
+            return people_from_payload(json.loads(body))
+        # A fresh response per page so no parsed selector is reused between rounds
+        return spider.parse_people(HtmlResponse(url=url, body=body, encoding='utf-8', request=Request(url)))
+
+    crawler.signals.send_catch_log(signals.spider_opened, spider=spider)
+    for pipeline in pipelines:
+        if hasattr(pipeline, 'open_spider'):
+            pipeline.open_spider(spider)
+
+    page_latencies = []
+    items_out = 0
+    items_dropped = 0
+    total_elapsed = 0.0
+
+    for round_no in range(warmup + rounds):
+        measured = round_no >= warmup
+        if round_no and not keep_dedup:
+            reset_dedup(pipelines, round_no)
+        for url, body in pages:
+            started = time.perf_counter()
+            for result in parse_page(url, body):
+                if result is None or isinstance(result, Request):
+                    continue
+                kept = run_pipelines(pipelines, result, spider) is not None
+                if measured:
+                    items_out += 1
+                    items_dropped += not kept
+            elapsed = time.perf_counter() - started
+            if measured:
+                page_latencies.append(elapsed)
+                total_elapsed += elapsed
+
+    for pipeline in pipelines:
+        if hasattr(pipeline, 'close_spider'):
+            pipeline.close_spider(spider)
+    crawler.signals.send_catch_log(signals.spider_closed, spider=spider, reason='finished')
+
+    latencies_ms = sorted(v * 1000.0 for v in page_latencies)
+    return {
+        'mode': mode,
+        'fixtures': len(pages),
+        'rounds': rounds,
+        'pages_parsed': len(page_latencies),
+        'items': items_out,
+        'items_dropped': items_dropped,
+        'elapsed_seconds': round(total_elapsed, 4),
+        'items_per_second': round(items_out / total_elapsed, 1) if total_elapsed else 0.0,
+        'page_latency_ms': {
+            'p50': round(percentile(latencies_ms, 50), 3),
+            'p90': round(percentile(latencies_ms, 90), 3),
+            'p99': round(percentile(latencies_ms, 99), 3),
+            'max': round(latencies_ms[-1], 3) if latencies_ms else 0.0,
+        },
+        'peak_rss_mb': round(peak_rss_bytes() / (1024 * 1024), 1),
+    }
+
+
+def print_report(result):
+    lat = result['page_latency_ms']
+    print(f"Fixtures:        {result['fixtures']} {result['mode']} pages x {result['rounds']} rounds ({result['pages_parsed']} parses)")
+    # With --keep-dedup, rounds replay the same pages, so DedupPipeline drops most items after the first pass
+    print(f"Items:           {result['items']} processed, {result['items_dropped']} dropped by pipelines")
+    print(f"Throughput:      {result['items_per_second']} items/sec")
+    print(f"Page latency:    p50 {lat['p50']} ms | p90 {lat['p90']} ms | p99 {lat['p99']} ms | max {lat['max']} ms")
+    print(f"Peak RSS:        {result['peak_rss_mb']} MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay saved Apollo result pages through parse_people and the pipelines.")
+    parser.add_argument('--mode', choices=sorted(FIXTURE_SUFFIXES), default='dom',
+                        help="Replay rendered pages through parse_people (dom) or search payloads (payload)")
+    parser.add_argument('--fixtures', default=None,
+                        help="Directory of saved .html pages (dom) or .json payloads (payload)")
+    parser.add_argument('--rounds', type=int, default=50, help="Measured passes over all fixtures")
+    parser.add_argument('--warmup', type=int, default=3, help="Unmeasured passes before timing starts")
+    parser.add_argument('--no-pipelines', action='store_true', help="Only time parse_people, skip ITEM_PIPELINES")
+    parser.add_argument('--keep-dedup', action='store_true',
+                        help="Keep the dedup index between rounds, timing the duplicate path after the first")
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="Override a Scrapy setting for the run (repeatable)")
+    parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Project settings are located from the current directory, so load them before moving
+    settings = load_settings(dict(item.split('=', 1) for item in args.set))
+    default_dir = DEFAULT_PAYLOAD_FIXTURES_DIR if args.mode == 'payload' else DEFAULT_FIXTURES_DIR
+    fixtures_dir = os.path.abspath(args.fixtures or default_dir)
+    # Keep anything the pipelines write to disk out of the working directory
+    with tempfile.TemporaryDirectory(prefix='apollo-bench-') as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            result = run_benchmark(settings, fixtures_dir, args.rounds, args.warmup, not args.no_pipelines, args.mode,
+                                   args.keep_dedup)
+        finally:
+            os.chdir(cwd)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -49,6 +49,33 @@ PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT = 90000  # 90 seconds (default is 30s) for
 PLAYWRIGHT_RETRY_REQUESTS = True
 PLAYWRIGHT_RETRY_TIMES = 3
 PLAYWRIGHT_BROWSER_POOL_SIZE = 4 # Number of browser contexts to keep alive for efficiency
+PLAYWRIGHT_MAX_CONTEXTS = 5 # One per search stream + the login context; raised by the spider to fit search_concurrency
+
+# Search streams: terms crawled in parallel, each in its own browser context (-a search_concurrency=N)
+APOLLO_SEARCH_CONCURRENCY = 4
+# Page turns (next-page clicks) allowed at once across all streams. They bypass the downloader,
+# so they are also spaced by AutoThrottle's current delay. Defaults to AUTOTHROTTLE_TARGET_CONCURRENCY.
+# APOLLO_PAGE_TURN_CONCURRENCY = 4
+# Search progress (term, page cursor, item counts) written after every page.
+# -a resume=1 continues from it, -a incremental=1 stops a term at the first page already in the dedup index.
+APOLLO_CHECKPOINT_PATH = 'apollo_checkpoint.json'
+# Abort unneeded sub-requests (images, fonts, analytics...) before the browser fetches them.
+# The predicate is configured by ResourceFilterExtension with the RESOURCE_FILTER_* settings below.
+PLAYWRIGHT_ABORT_REQUEST = 'apollo_scraper.resources.abort_request'
+
+# Browser resource filtering
+RESOURCE_FILTER_ENABLED = True
+RESOURCE_FILTER_BLOCKED_TYPES = ['image', 'media', 'font', 'stylesheet'] # Playwright resource types
+RESOURCE_FILTER_BLOCKED_URL_PATTERNS = [ # Regexes matched against the request URL
+    r'google-analytics\.com', r'googletagmanager\.com', r'doubleclick\.net', r'segment\.(io|com)',
+    r'hotjar\.com', r'intercom(cdn)?\.io', r'fullstory\.com', r'sentry\.io', r'facebook\.net',
+    r'hs-analytics\.net', r'amplitude\.com', r'mixpanel\.com',
+]
+RESOURCE_FILTER_ALLOWED_URL_PATTERNS = [ # Never aborted, even if blocked above (e.g. login captchas)
+    r'recaptcha', r'hcaptcha\.com', r'challenges\.cloudflare\.com',
+]
+# Estimated (bytes, milliseconds) saved per aborted request, by resource type
+# RESOURCE_FILTER_COST_ESTIMATES = {'image': (40000, 60), 'font': (35000, 50)}
 
 # Define the user agents for rotation
 USER_AGENTS = [
@@ -66,9 +93,32 @@ USER_AGENTS = [
 DOWNLOADER_MIDDLEWARES = {
     'scrapy.downloadermiddlewares.useragent.UserAgentMiddleware': None, # Disable default Scrapy UA
     'apollo_scraper.middlewares.RotatingUserAgentMiddleware': 400, # Enable custom UA middleware
+    'apollo_scraper.ratelimit.RateLimitMiddleware': 560, # 429 / Retry-After backoff and re-queue (RATELIMIT_*)
     'scrapy.downloadermiddlewares.httpproxy.HttpProxyMiddleware': 750, # Enable proxy middleware if using
 }
 
+# Configure extensions
+# See https://docs.scrapy.org/en/latest/topics/extensions.html
+EXTENSIONS = {
+    'apollo_scraper.resources.ResourceFilterExtension': 500, # Browser resource filtering (RESOURCE_FILTER_*)
+    'apollo_scraper.metrics.MetricsExtension': 510, # Stage latency histograms (METRICS_*)
+    'apollo_scraper.memory.MemoryGovernor': 520, # Pauses new requests above MEMORY_BUDGET_MB
+    'apollo_scraper.coordinator.WorkerStatsExport': 530, # Stats dump for coordinated runs (WORKER_STATS_PATH)
+}
+
+# Memory budget (MemoryGovernor): RSS of the crawler plus its browser processes
+MEMORY_GOVERNOR_ENABLED = True
+MEMORY_BUDGET_MB = 4096 # Stop pulling new requests from the scheduler above this (0 disables)
+MEMORY_RESUME_RATIO = 0.85 # Resume once usage drops below this fraction of the budget
+MEMORY_CHECK_INTERVAL = 5 # Seconds between measurements
+
+# Per-stage latency metrics (MetricsExtension)
+METRICS_ENABLED = True
+METRICS_INTERVAL = 30 # Seconds between snapshots
+METRICS_JSONL_PATH = 'apollo_metrics.jsonl' # One JSON snapshot per line; set to None to disable
+METRICS_PROMETHEUS_PORT = 0 # e.g. 9410 to serve Prometheus text on /metrics; 0 disables the endpoint
+METRICS_PROMETHEUS_HOST = '127.0.0.1'
+
 # Proxy settings (for Zyte Smart Proxy Manager)
 # Replace 'YOUR_ZYTE_API_KEY' with your actual Zyte API key.
 # It's highly recommended to use an environment variable for this:
@@ -80,14 +130,48 @@ HTTPPROXY_URL = 'http://proxy.zyte.com:8011' # Use HTTPS for HTTPS sites: 'https
 # Retry middleware settings
 RETRY_ENABLED = True
 RETRY_TIMES = 5 # Number of times to retry a failed request
-RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524, 408, 429] # HTTP codes to retry on
+RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524, 408] # HTTP codes to retry on (429 is handled by RateLimitMiddleware)
+
+# Rate-limit backoff (RateLimitMiddleware + in-page pagination)
+RATELIMIT_HTTP_CODES = [429]
+RATELIMIT_BASE_DELAY = 5 # Seconds; doubled for every consecutive hit unless the server sends Retry-After
+RATELIMIT_BACKOFF_FACTOR = 2
+RATELIMIT_MAX_DELAY = 300 # Upper bound for one backoff window, Retry-After included
+RATELIMIT_MAX_RETRIES = 5 # Re-queues per request / search term before giving up
 
 # Item pipeline settings
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
+    'apollo_scraper.pipelines.DedupPipeline': 100,
     'apollo_scraper.pipelines.ApolloPipeline': 300,
+    'apollo_scraper.pipelines.SQLiteStoragePipeline': 800,
+    'apollo_scraper.exports.RotatingExportPipeline': 900,
 }
 
+# Cross-run duplicate filtering (DedupPipeline), keyed on normalized email / LinkedIn URL
+DEDUP_ENABLED = True
+DEDUP_INDEX_PATH = 'apollo_dedup.db' # Kept between runs; delete it to start from scratch
+DEDUP_BLOOM_CAPACITY = 1000000 # Expected number of keys; grows automatically if the index is bigger
+DEDUP_BLOOM_ERROR_RATE = 0.001
+DEDUP_SHARED = False # Set by the coordinator: several worker processes share the index, so no in-memory Bloom filter
+DEDUP_RUN_STARTED_AT = 0 # Set by the coordinator: keys stored after this time.time() belong to the current run
+
+# SQLite storage (SQLiteStoragePipeline)
+SQLITE_STORAGE_ENABLED = True
+SQLITE_STORAGE_PATH = 'apollo_people.db'
+SQLITE_STORAGE_BATCH_SIZE = 500 # Items per INSERT transaction
+SQLITE_STORAGE_FLUSH_INTERVAL = 5.0 # Seconds; also flush partial batches this often
+SQLITE_STORAGE_MAX_BUFFER = 5000 # Max items waiting to be committed before item processing waits
+SQLITE_STORAGE_USE_EXECUTOR = True # Write from a background thread so the reactor never blocks on disk I/O
+
+# Streaming export in rotating parts (RotatingExportPipeline); each finished part gets a .manifest.json
+EXPORT_ENABLED = True
+EXPORT_DIR = 'exports'
+EXPORT_FORMAT = 'jsonl.gz' # 'jsonl.gz', 'csv' or 'parquet' (needs pyarrow)
+EXPORT_MAX_ITEMS = 100000 # Rotate after this many items (0 = no limit)
+EXPORT_MAX_BYTES = 256 * 1024 * 1024 # Rotate once a part reaches this size on disk (0 = no limit)
+EXPORT_PARQUET_ROW_GROUP_SIZE = 10000 # Rows buffered per Parquet row group
+
 # Export settings
 # FEED_FORMAT = 'csv' # Uncomment and set to 'csv', 'json', 'jsonl' etc.
 # FEED_URI = 'apollo_people.csv' # Uncomment to enable automatic export to this file.
@@ -95,10 +179,38 @@ ITEM_PIPELINES = {
 # You can also define specific fields and their order for CSV/JSON
 # FEED_EXPORT_FIELDS = ['name', 'title', 'company', 'email', 'phone', 'linkedin_url', 'location']
 
+# Extraction settings
+# 'compiled' extracts all rows with precompiled XPath in one pass (fast path).
+# 'itemloader' builds one ItemLoader per row (reference path, useful when debugging selectors).
+APOLLO_ROW_EXTRACTOR = 'compiled'
+# 'dom' waits for and parses the rendered results.
+# 'payload' captures the search JSON the page loads and maps it straight to items,
+# falling back to 'dom' parsing for a page when no payload arrives (-a extraction_mode=payload).
+APOLLO_EXTRACTION_MODE = 'dom'
+APOLLO_PAYLOAD_TIMEOUT = 30 # Seconds to wait for the search payload before falling back
+# Worker processes for row extraction and block detection ('compiled' extractor only).
+# 0 parses on the reactor thread; e.g. 2-4 keeps large pages from stalling the Playwright event loop.
+APOLLO_PARSE_WORKERS = 0
+APOLLO_PARSE_MAX_PENDING = 0 # Pages queued or parsing at once before streams wait; 0 = 2 per worker
+
+# Rendered-page snapshots per (search term, page), gzip-compressed (opt-in).
+# Re-test selectors offline with: scrapy crawl apollo -a from_cache=1
+# (replays skip the dedup index and write storage, exports and checkpoint under
+# SNAPSHOT_CACHE_DIR/replay, unless overridden with -s). Only DOM-parsed pages are snapshotted.
+SNAPSHOT_CACHE_ENABLED = False
+SNAPSHOT_CACHE_DIR = 'snapshots'
+SNAPSHOT_CACHE_TTL = 7 * 24 * 3600 # Seconds a snapshot stays usable (0 = no expiry)
+SNAPSHOT_CACHE_MAX_MB = 2048 # Compressed size cap; oldest snapshots are evicted first (0 = no cap)
+
 # Logging settings
 LOG_LEVEL = 'INFO' # Set to 'DEBUG' for more verbose output during development
 LOG_FILE = 'apollo_spider.log' # Log output to a file
 
+# Login session reuse: the state saved after login is probed first and only replaced by a
+# full login when it is missing, older than APOLLO_SESSION_MAX_AGE or no longer logged in.
+APOLLO_SESSION_MAX_AGE = 12 * 3600 # Seconds
+APOLLO_SESSION_PROBE_TIMEOUT = 15000 # Milliseconds
+
 # User credentials (fallback, can be overridden by command line)
 APOLLO_EMAIL = 'YOUR_EMAIL@example.com' # Replace with your Apollo.io email
 APOLLO_PASSWORD = 'YOUR_PASSWORD_HERE' # Replace with your Apollo.io password